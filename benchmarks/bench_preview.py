@@ -0,0 +1,129 @@
+"""Validate the preview estimates against the exact results on synthetic datasets.
+
+For each size, a synthetic dataset is generated once (see
+:mod:`generate_dataset`) and its Parquet cache built. The exact rating
+correlations, means per tenure, category and location, and monthly trends
+are computed over every row; then previews of ``--sample`` rows are drawn
+with several seeds (see :mod:`employee_sentiment.preview`), and for each
+the harness reports:
+
+- the share of confidence intervals that cover the exact value, which
+  should be close to their level,
+- the largest error of the estimates, and the widest interval,
+- the time to compute the exact results and to draw the preview and its
+  intervals.
+
+Exits with an error when the coverage of any kind of estimate falls below
+``--min-coverage``.
+
+Usage::
+
+    python benchmarks/bench_preview.py --rows 100000 1000000 --sample 20000 --seeds 10
+"""
+
+import argparse # For the command line interface
+import os # For paths
+import sys # For the import path
+import time # For timing the runs
+
+import numpy as np # For the comparisons
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from employee_sentiment.aggregations import AGGREGATE_COLUMNS, GROUP_COLUMNS, aggregate_chunks # noqa: E402
+from employee_sentiment.data_loader import RATING_COLUMNS # noqa: E402
+from employee_sentiment.dataset_cache import ensure_cache, iter_cached # noqa: E402
+from employee_sentiment.preview import Preview # noqa: E402
+from employee_sentiment.trend_cube import ensure_cube # noqa: E402
+from generate_dataset import generate_dataset # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROWS = [100_000, 1_000_000]
+
+GRANULARITY = 'M'
+
+
+def exact_results(path):
+    """The exact estimates of the preview, by table name, computed over every row of ``path``."""
+    aggregator = aggregate_chunks(iter_cached(path, columns=AGGREGATE_COLUMNS))
+    results = {'rating_correlation_ci': aggregator.correlation().loc[RATING_COLUMNS, RATING_COLUMNS]}
+    for table, key in zip(['tenure_means_ci', 'engagement_means_ci', 'location_means_ci'], GROUP_COLUMNS):
+        results[table] = aggregator.group_means(key)
+    results['trends_ci'] = ensure_cube(path).trend(GRANULARITY).dropna()
+    return results
+
+
+def _intervals(preview):
+    """The estimates and intervals of ``preview`` checked against the exact results, by table name."""
+    tables = preview.confidence_intervals('bivariate')
+    tables.update(preview.confidence_intervals('temporal', GRANULARITY))
+    return tables
+
+
+def compare(exact, tables):
+    """Per table, the intervals covering the exact value, the intervals, the largest error and widest interval."""
+    results = {}
+    for name, intervals in tables.items():
+        truth, estimate, low, high = exact[name], intervals['estimate'], intervals['low'], intervals['high']
+        if name == 'rating_correlation_ci':
+            # One row per pair of ratings
+            truth = [truth.loc[first, second] for first, second in intervals.index]
+        else:
+            truth = truth.set_axis(truth.index.astype(estimate.index.dtype)).reindex(estimate.index)
+        truth, estimate, low, high = (np.asarray(table, dtype='float64') for table in [truth, estimate, low, high])
+        covered = (low <= truth) & (truth <= high)
+        results[name] = (int(covered.sum()), covered.size, float(np.nanmax(np.abs(estimate - truth))),
+                         float(np.nanmax(high - low)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--sample', type=int, default=20_000, help='rows of each preview')
+    parser.add_argument('--seeds', type=int, default=10, help='previews drawn per dataset')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic datasets')
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'benchmarks', 'data'),
+                        help='where the synthetic datasets are kept between runs')
+    parser.add_argument('--min-coverage', type=float, default=0.85,
+                        help='least share of the 95%% intervals covering the exact values')
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f'{"rows":>10} {"table":<22} {"coverage":>9} {"max error":>10} {"max width":>10} '
+          f'{"exact s":>8} {"preview s":>10}')
+    for rows in args.rows:
+        path = os.path.join(args.data_dir, f'synthetic_{rows}_{args.seed}.csv')
+        if not os.path.exists(path):
+            generate_dataset(path, rows, seed=args.seed)
+        ensure_cache(path)
+        start = time.perf_counter()
+        exact = exact_results(path)
+        exact_time = time.perf_counter() - start
+
+        totals, preview_time = {}, 0.0
+        for seed in range(args.seeds):
+            start = time.perf_counter()
+            tables = _intervals(Preview.draw(path, args.sample, seed=seed))
+            preview_time += time.perf_counter() - start
+            for name, (covered, size, error, width) in compare(exact, tables).items():
+                previous = totals.get(name, (0, 0, 0.0, 0.0))
+                totals[name] = (previous[0] + covered, previous[1] + size, max(previous[2], error),
+                                max(previous[3], width))
+
+        for name, (covered, size, error, width) in totals.items():
+            coverage = covered / size
+            print(f'{rows:>10} {name:<22} {coverage:>9.3f} {error:>10.4f} {width:>10.4f} '
+                  f'{exact_time:>8.2f} {preview_time / args.seeds:>10.2f}')
+            if coverage < args.min_coverage:
+                failures.append(f'{rows}/{name}: coverage {coverage:.3f} < {args.min_coverage}')
+
+    for line in failures:
+        print(f'undercovered: {line}')
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Benchmark every section of the analysis on synthetic datasets of several sizes.
+
+For each size, a synthetic dataset is generated once (see
+:mod:`generate_dataset`) and its Parquet cache built. Each section is then
+run on its own through the command line, in a fresh process, with its
+figures saved and its stages recorded (see :mod:`instrumentation`). For
+every run the harness reports:
+
+- the wall and CPU time of the whole process, start-up included, and its
+  peak RSS while running the section,
+- the time spent computing the section and rendering its figures,
+- the rows the section read.
+
+Results can be saved as JSON and compared with an earlier run,
+flagging the sections that got slower or larger than ``--tolerance``.
+
+Usage::
+
+    python benchmarks/bench_sections.py --rows 10000 100000 1000000 --output results.json
+    python benchmarks/bench_sections.py --baseline results.json
+"""
+
+import argparse # For the command line interface
+import json # For the stage statistics and results
+import os # For paths and process statistics
+import subprocess # For running each section in a fresh process
+import sys # For the interpreter and the import path
+import tempfile # For the stage statistics of each run
+import time # For timing the runs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from employee_sentiment.dataset_cache import cache_paths # noqa: E402
+from employee_sentiment.sections import SECTIONS # noqa: E402
+from generate_dataset import generate_dataset # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+
+# Results compared against a baseline
+COMPARED = ['wall', 'peak_rss']
+
+
+# Builds the cache of the dataset argv[1], writing its stage statistics to argv[2]
+BUILD_SCRIPT = '''
+import sys
+from employee_sentiment.dataset_cache import ensure_cache
+from employee_sentiment.instrumentation import Profiler, profiling
+with profiling(Profiler()) as profiler:
+    ensure_cache(sys.argv[1])
+profiler.write(sys.argv[2])
+'''
+
+
+def run_process(args, metrics_path):
+    """Run ``args`` from the repository root, returning its wall and CPU time and its stage statistics.
+
+    The peak RSS is the largest of the peaks of its stages: the ``ru_maxrss``
+    of a child process also counts the memory of the parent it was forked from.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])),
+               MPLBACKEND='Agg')
+    with tempfile.TemporaryFile() as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen(args, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=errors)
+        # wait4 gives the statistics of this process alone
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        if os.waitstatus_to_exitcode(status):
+            errors.seek(0)
+            raise SystemExit(f'{" ".join(args)} failed:\n{errors.read().decode()}')
+    with open(metrics_path) as file:
+        stages = json.load(file)['stages']
+    result = {
+        'wall': wall,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'peak_rss': max((stats['peak_rss'] for stats in stages.values()), default=0),
+    }
+    return result, stages
+
+
+def prepare(rows, data_dir, seed):
+    """Generate the dataset of ``rows`` rows if needed, and build its cache; returns its path and build statistics."""
+    path = os.path.join(data_dir, f'synthetic_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        generate_dataset(path, rows, seed=seed)
+    # Always time a full build
+    for cache_file in cache_paths(path):
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_path = os.path.join(tmp, 'stages.json')
+        result, _ = run_process([sys.executable, '-c', BUILD_SCRIPT, path, metrics_path], metrics_path)
+    return path, result
+
+
+def bench_section(name, path, output_dir):
+    """Run section ``name`` on ``path`` in a fresh process and collect its statistics."""
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_path = os.path.join(tmp, 'stages.json')
+        result, stages = run_process([sys.executable, '-m', 'employee_sentiment', name, '--dataset', path,
+                                      '--output-dir', output_dir, '--metrics', metrics_path], metrics_path)
+    section = stages.get(f'section.{name}', {})
+    result['compute'] = section.get('wall', 0.0)
+    result['render'] = sum(stats['wall'] for stage, stats in stages.items() if stage.startswith('render.'))
+    result['rows_read'] = sum(stats['rows'] for stage, stats in stages.items() if stage.startswith('read_'))
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing the results that are worse than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for measure in COMPARED:
+            if result[measure] > previous[measure] * (1 + tolerance):
+                regressions.append(f'{key} {measure}: {previous[measure]:.4g} -> {result[measure]:.4g}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--sections', nargs='+', default=list(SECTIONS), choices=list(SECTIONS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'benchmarks', 'data'),
+                        help='where the synthetic datasets are kept between runs')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results with this JSON file of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative slowdown or growth flagged')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f'{"rows":>10} {"section":<15} {"wall s":>8} {"cpu s":>8} {"compute s":>10} {"render s":>9} '
+          f'{"peak MiB":>9} {"rows read":>11}')
+    with tempfile.TemporaryDirectory() as output_dir:
+        for rows in args.rows:
+            path, build = prepare(rows, args.data_dir, args.seed)
+            results[f'{rows}/cache_build'] = build
+            print(f'{rows:>10} {"cache_build":<15} {build["wall"]:>8.2f} {build["cpu"]:>8.2f} {"":>10} {"":>9} '
+                  f'{build["peak_rss"] / 2 ** 20:>9.0f}')
+            for name in args.sections:
+                result = results[f'{rows}/{name}'] = bench_section(name, path, output_dir)
+                print(f'{rows:>10} {name:<15} {result["wall"]:>8.2f} {result["cpu"]:>8.2f} '
+                      f'{result["compute"]:>10.2f} {result["render"]:>9.2f} {result["peak_rss"] / 2 ** 20:>9.0f} '
+                      f'{result["rows_read"]:>11,}')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f'regression: {line}')
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Benchmark the batched sentiment scoring on a synthetic comment corpus.
+
+Usage::
+
+    python benchmarks/bench_sentiment.py --rows 1000000 --batch-size 100000
+"""
+
+import argparse # For the command line interface
+import os # For locating the analysis modules
+import sys # For importing the analysis modules
+import time # For timing the runs
+
+import pandas as pd # For data manipulation
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from bench_word_frequency import synthetic_comments # noqa: E402
+from employee_sentiment.sentiment_scores import LABELS, score_comments # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    frame = pd.DataFrame({'Comment_Positives': synthetic_comments(args.rows)})
+    start = time.perf_counter()
+    score_comments(frame, columns=['Comment_Positives'], batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+
+    labels = frame['Comment_Positives_Sentiment_Label'].value_counts().reindex(LABELS)
+    print(f'{args.rows} comments in batches of {args.batch_size}: {elapsed:.2f} s, {args.rows / elapsed:,.0f} rows/s')
+    print(labels.to_string())
+
+
+if __name__ == '__main__':
+    main()
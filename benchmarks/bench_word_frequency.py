@@ -0,0 +1,64 @@
+"""Benchmark the word counting of section 4.3 on 1 to N worker processes.
+
+A synthetic corpus of comments (see :mod:`generate_dataset`) is generated in memory, split into
+chunks as the cached loader would deliver them, and counted with an
+increasing number of workers. The tables of every run are checked to be
+identical to the single-process one.
+
+Usage::
+
+    python benchmarks/bench_word_frequency.py --rows 3000000 --max-workers 8
+"""
+
+import argparse # For the command line interface
+import os # For the number of available cores
+import sys # For importing the analysis modules
+import time # For timing the runs
+
+import numpy as np # For generating the corpus
+import pandas as pd # For data manipulation
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from employee_sentiment.word_counts import TEXT_COLUMNS, count_words # noqa: E402
+from generate_dataset import comments # noqa: E402
+
+def synthetic_comments(rows, seed=0):
+    """A Series of ``rows`` positive comments, as :mod:`generate_dataset` writes them."""
+    return pd.Series(comments(np.random.default_rng(seed), 'Comment_Positives', rows))
+
+
+def make_chunks(rows, chunksize):
+    comments = synthetic_comments(rows)
+    frame = pd.DataFrame({col: comments.sample(frac=1, random_state=i).to_numpy() for i, col in enumerate(TEXT_COLUMNS)})
+    return [frame.iloc[start:start + chunksize] for start in range(0, rows, chunksize)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=3_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    chunks = make_chunks(args.rows, args.chunksize)
+    print(f'{args.rows} rows x {len(TEXT_COLUMNS)} comment columns, {len(chunks)} chunks, {os.cpu_count()} cores')
+    print(f'{"workers":>8} {"seconds":>9} {"rows/s":>12} {"speedup":>8}')
+
+    baseline = reference = None
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        counters = count_words(chunks, workers=workers)
+        elapsed = time.perf_counter() - start
+        tables = {col: counter.frequencies() for col, counter in counters.items()}
+        if reference is None:
+            baseline, reference = elapsed, tables
+        elif tables != reference:
+            raise SystemExit(f'{workers} workers produced different word counts')
+        print(f'{workers:>8} {elapsed:>9.2f} {args.rows / elapsed:>12,.0f} {baseline / elapsed:>8.2f}')
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
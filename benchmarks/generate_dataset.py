@@ -0,0 +1,223 @@
+"""Generate a synthetic feedback dataset with the schema of Dataset.csv.
+
+The real dataset cannot be shared, so benchmarks run on synthetic data of
+any size. The columns, their order and their formats are those of the
+real export, and the values follow the distributions the analysis found:
+
+- ``Work_Balance_Stars`` and ``Senior_Management_Stars`` track
+  ``Overall_Ratings`` (mostly 3 and 4); ``Culture_Values_Stars`` and
+  ``Career_Opportunities_Stars`` range from 2 to 5 around 4.4,
+- ``Comp_Benefit_Stars`` ranges from 1 to 3, mostly 1,
+- ``Career_Growth_Opportunities_Stars`` grows with ``Employee_Tenure``
+  (1 to 10 years, uniform),
+- ``Wellness_Programs_Satisfaction`` is high for employees taking part in
+  engagement activities and low for the others,
+- ``Remote_Work_Satisfaction`` ranges from 1 to 4, following work-life
+  balance and overall ratings,
+- the comments are free text of a few words to a few dozen (six in the
+  median), drawn with Zipf frequencies from a vocabulary of 5,000 words per
+  column: common words, the topical words of the column (praise,
+  complaints or advice, so the sentiment of each column shows), then
+  made-up words. One comment in ten is a stock short comment ("Good pay",
+  "Nothing") repeated word for word; none of them is a token pandas reads
+  as missing, such as "None" or "N/A". About a third of the advice to
+  management is missing (as in the real data, no other column has missing
+  values).
+
+Rows are generated and written ``chunksize`` at a time, each chunk from its
+own seed, so memory stays flat up to tens of millions of rows and the same
+``--seed`` always gives the same file.
+
+Usage::
+
+    python benchmarks/generate_dataset.py synthetic.csv --rows 1000000
+"""
+
+import argparse # For the command line interface
+import functools # For building each vocabulary once
+import itertools # For interleaving the words of the vocabularies
+import os # For the output directory
+import sys # For the import path
+
+import numpy as np # For drawing the values
+import pandas as pd # For writing the CSV
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from employee_sentiment.data_loader import COLUMNS # noqa: E402
+from employee_sentiment.dataset_cache import _temp_path # noqa: E402
+
+LOCATIONS = ['CityA', 'CityB', 'CityC']
+
+# Feedback is given over one year, at the time of day of the real export
+FIRST_DATE = pd.Timestamp('2023-01-01 23:32:22.717722')
+DAYS = 365
+
+# Words of the comments, by rank: the words shared by every column and the
+# topical words of each column alternate, then made-up words fill the
+# vocabulary up to VOCABULARY_SIZE. Words are drawn with Zipf frequencies of
+# their rank, so a few words make most of the text and most words are rare
+COMMON_WORDS = (
+    'the and to is of a in for are with it you they not very but people work company team there be so '
+    'lot can no have more at on as get your all some about if we time do too than much this from will'
+).split()
+
+TOPICAL_WORDS = {
+    'Comment_Positives': (
+        'good great people culture benefits pay balance smart friendly work life flexible management '
+        'learning opportunities growth amazing supportive team environment salary perks colleagues '
+        'competitive remote stable interesting training excellent fun collaborative impact manager '
+        'respect office food hours freedom best nice career transparent leadership talented caring '
+        'rewarding innovative exciting autonomy trust happy helpful generous appreciated decent fair'
+    ).split(),
+    'Comment_Negatives': (
+        'long hours politics management pay poor slow growth meetings micromanagement limited stressful '
+        'deadlines low salary lack communication turnover recognition reorganizations commute '
+        'disorganized processes unclear priorities favoritism promotions overworked layoffs bureaucracy '
+        'pressure boring hard nothing toxic chaotic burnout underpaid frustrating inconsistent issues '
+        'problems unfair ignored difficult overtime worse expensive tedious unprofessional bad'
+    ).split(),
+    'Advice_To_Mgmt': (
+        'listen employees reward performance keep good work pay more respect balance improve '
+        'communication promote within reduce bureaucracy stop micromanaging invest training transparent '
+        'value hire better managers focus recognize hard remote options fix processes user trust '
+        'feedback clear goals career paths raise salaries hiring culture priorities fewer meetings'
+    ).split(),
+}
+
+# Short stock comments, repeated word for word as in the real data
+STOCK_COMMENTS = {
+    'Comment_Positives': ['Great work life balance', 'Good pay', 'Great culture', 'Smart people', 'Free food',
+                          'Great benefits', 'Flexible hours', 'Good management'],
+    'Comment_Negatives': ['Long hours', 'Office politics', 'Nothing', 'No complaints', 'Poor management',
+                          'Low salary', 'Too many meetings', 'Micromanagement'],
+    'Advice_To_Mgmt': ['Keep up the good work', 'Listen to your employees', 'Pay people more', 'Keep it up',
+                       'Nothing to add', 'Improve communication'],
+}
+
+# Share of the comments that are stock comments
+STOCK_SHARE = 0.1
+
+VOCABULARY_SIZE = 5_000
+ZIPF_EXPONENT = 1.1
+
+# Seed of the made-up words, the same for every dataset
+VOCABULARY_SEED = 0
+SYLLABLES = [consonant + vowel for consonant in 'bcdfghklmnprstvwz' for vowel in 'aeiou']
+
+# Words per comment: log-normal around LENGTH_MEDIAN, at most MAX_LENGTH
+LENGTH_MEDIAN = 6
+LENGTH_SIGMA = 0.8
+MAX_LENGTH = 80
+
+# Share of the advice to management that is missing
+MISSING_ADVICE = 0.35
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+@functools.lru_cache(maxsize=None)
+def vocabulary(column):
+    """The words of the comments of ``column``, by rank."""
+    topical = TOPICAL_WORDS[column]
+    words = [word for pair in itertools.zip_longest(COMMON_WORDS, topical) for word in pair if word is not None]
+    words = list(dict.fromkeys(words))
+    known = set(words)
+    rng = np.random.default_rng(VOCABULARY_SEED)
+    while len(words) < VOCABULARY_SIZE:
+        word = ''.join(rng.choice(SYLLABLES, size=rng.integers(2, 5)))
+        if word not in known:
+            known.add(word)
+            words.append(word)
+    return np.array(words, dtype=object)
+
+
+def _zipf_weights(size):
+    weights = 1.0 / np.arange(1, size + 1) ** ZIPF_EXPONENT
+    return weights / weights.sum()
+
+
+def comments(rng, column, rows):
+    """``rows`` comments of ``column``: free text of Zipf-distributed words, and a share of stock comments."""
+    words = vocabulary(column)
+    lengths = np.clip(np.rint(rng.lognormal(np.log(LENGTH_MEDIAN), LENGTH_SIGMA, size=rows)), 1, MAX_LENGTH)
+    lengths = lengths.astype('int64')
+    drawn = words[rng.choice(len(words), size=int(lengths.sum()), p=_zipf_weights(len(words)))].tolist()
+    ends = np.cumsum(lengths).tolist()
+    text = np.array([' '.join(drawn[end - length:end]).capitalize() for end, length in zip(ends, lengths.tolist())],
+                    dtype=object)
+    stock = np.array(STOCK_COMMENTS[column], dtype=object)
+    picked = rng.random(rows) < STOCK_SHARE
+    text[picked] = stock[rng.integers(0, len(stock), size=int(picked.sum()))]
+    return text
+
+
+def _clip(values, low, high):
+    return np.clip(np.rint(values), low, high).astype('int64')
+
+
+def generate_chunk(rows, first_id, seed):
+    """One chunk of ``rows`` synthetic rows, with IDs from ``first_id`` upwards."""
+    rng = np.random.default_rng(seed)
+    overall = rng.choice([1, 2, 3, 4, 5], size=rows, p=[0.06, 0.11, 0.30, 0.33, 0.20])
+    work_balance = np.where(rng.random(rows) < 0.95, overall, _clip(overall + rng.choice([-1, 1], size=rows), 1, 5))
+    management = np.where(rng.random(rows) < 0.95, overall, _clip(overall + rng.choice([-1, 1], size=rows), 1, 5))
+    culture = _clip(overall + 1 - (rng.random(rows) < 0.05), 2, 5)
+    tenure = rng.integers(1, 11, size=rows)
+    engaged = rng.random(rows) < 0.5
+    wellness = np.where(engaged, rng.choice([3, 4, 5], size=rows, p=[0.1, 0.3, 0.6]),
+                        rng.choice([1, 2, 3], size=rows, p=[0.35, 0.4, 0.25]))
+    advice = comments(rng, 'Advice_To_Mgmt', rows)
+    advice[rng.random(rows) < MISSING_ADVICE] = None
+
+    frame = pd.DataFrame({
+        'ID': first_id + np.cumsum(rng.integers(1, 4, size=rows)) - 1,
+        'Comment_Positives': comments(rng, 'Comment_Positives', rows),
+        'Comment_Negatives': comments(rng, 'Comment_Negatives', rows),
+        'Advice_To_Mgmt': advice,
+        'Overall_Ratings': overall,
+        'Work_Balance_Stars': work_balance,
+        'Culture_Values_Stars': culture,
+        'Career_Opportunities_Stars': np.where(rng.random(rows) < 0.97, culture, _clip(culture - 1, 2, 5)),
+        'Comp_Benefit_Stars': rng.choice([1, 2, 3], size=rows, p=[0.47, 0.33, 0.20]),
+        'Senior_Management_Stars': management,
+        'Employee_Engagement_Activities': np.where(engaged, 'Yes', 'No'),
+        'Employee_Tenure': tenure,
+        'Location': np.array(LOCATIONS)[rng.integers(0, len(LOCATIONS), size=rows)],
+        'Feedback_Date': (FIRST_DATE + pd.to_timedelta(rng.integers(0, DAYS, size=rows), unit='D')).astype(str),
+        'Career_Growth_Opportunities_Stars': _clip(1 + (tenure - 3) * 0.8 + rng.normal(0, 1, size=rows), 1, 5),
+        'Wellness_Programs_Satisfaction': wellness,
+        'Remote_Work_Satisfaction': _clip((work_balance + overall) / 2 - 1 + rng.normal(0, 0.7, size=rows), 1, 4),
+    })
+    return frame[COLUMNS]
+
+
+def generate_dataset(path, rows, seed=0, chunksize=DEFAULT_CHUNKSIZE):
+    """Write ``rows`` synthetic rows to the CSV file ``path``, ``chunksize`` rows at a time."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = _temp_path(path)
+    next_id = 1
+    with open(tmp_path, 'w', newline='') as file:
+        for index, start in enumerate(range(0, rows, chunksize)):
+            chunk = generate_chunk(min(chunksize, rows - start), next_id, seed=(seed, index))
+            chunk.to_csv(file, header=index == 0, index=False)
+            next_id = int(chunk['ID'].iloc[-1]) + 1
+        if rows == 0:
+            pd.DataFrame(columns=COLUMNS).to_csv(file, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', help='path of the CSV file to write')
+    parser.add_argument('--rows', type=int, default=30_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+    generate_dataset(args.path, args.rows, args.seed, args.chunksize)
+
+
+if __name__ == '__main__':
+    main()
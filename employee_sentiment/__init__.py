@@ -0,0 +1,52 @@
+"""Employee Feedback Sentiment Analysis.
+
+Understanding employee sentiment from surveys and reviews to improve
+employee engagement and productivity. The analysis is split into sections,
+each a function of :mod:`employee_sentiment.sections` that can be imported
+and run on its own:
+
+- ``overview``: the first rows, summary statistics and missing values,
+- ``univariate``: the distribution of each numerical and categorical column,
+- ``bivariate``: rating correlations, ratings per tenure, engagement and
+  location, and tenure per category,
+- ``word_frequency``: word clouds of the comment columns,
+- ``temporal``: weekly (or daily, monthly, quarterly) averages of the ratings,
+- ``sentiment``: sentiment labels of the comments.
+
+From the command line, sections are picked by name::
+
+    python -m employee_sentiment temporal --dataset Dataset.csv
+
+or previewed, with confidence intervals, on a stratified sample of the
+rows (see :mod:`employee_sentiment.preview`)::
+
+    python -m employee_sentiment temporal --preview 50000 --dataset Dataset.csv
+
+and their results and figures are served over HTTP by
+:mod:`employee_sentiment.service`::
+
+    python -m employee_sentiment.service --dataset Dataset.csv
+
+The modules behind the sections (the chunked loader, the dataset cache and
+index, the aggregations, the figures, ...) are in the package too; those
+with a command line of their own run with ``python -m``, e.g.::
+
+    python -m employee_sentiment.report Dataset.csv --output-dir report
+
+The narrative of the analysis, with the findings of each section, is in
+``Employee_Sentiment.ipynb``.
+"""
+
+__all__ = [
+    'DATASET_PATH', 'SECTIONS', 'bivariate', 'open_comment_cache', 'overview', 'run', 'sentiment', 'temporal',
+    'univariate', 'word_frequency',
+]
+
+
+def __getattr__(name):
+    # The sections are imported on first use, so that the modules of the
+    # package run with ``python -m`` are not imported twice
+    if name in __all__:
+        from . import sections
+        return getattr(sections, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
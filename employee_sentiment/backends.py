@@ -0,0 +1,316 @@
+"""Execution backends for running the mergeable aggregations over dataset shards.
+
+Multi-year exports do not fit on one machine, even read in chunks. They are
+kept instead as shards: Parquet or CSV files with the columns of the
+dataset, in a directory (partitioned subdirectories included) or matched by
+a glob. Every statistic behind sections 4.1 to 4.4 is mergeable (the
+:class:`~aggregations.RatingAggregator` sums, the
+:class:`~distributions.ValueCounter` counts, the
+:class:`~word_counts.TokenCounter` tables and the
+:class:`~trend_cube.TrendCube` cells), so a section runs as a
+map-reduce:
+
+- a task (e.g. :func:`~aggregations.aggregate_chunks`) turns the chunks of
+  one shard into a partial result, where the shard is,
+- the partial results are combined with their associative ``merge``, in
+  shard order, so the result does not depend on the backend or the number
+  of workers.
+
+Three backends run the tasks:
+
+- ``local``: one shard after the other, in this process,
+- ``processes``: a pool of local worker processes, one shard per task,
+- ``dask``: a ``dask.distributed`` cluster, given the address of its
+  scheduler or started as a local process cluster, with the partial
+  results merged in a tree on the workers. Needs ``dask[distributed]``.
+
+Only the partial results travel between processes, never the rows.
+
+Usage::
+
+    python -m employee_sentiment.backends split Dataset.csv shards/ --rows 100000
+    python -m employee_sentiment.backends verify shards/ --backend processes --workers 4
+    python -m employee_sentiment bivariate --dataset shards/ --backend processes
+"""
+
+import argparse # For the command line interface
+import glob # For shards given as a glob
+import os # For the shard directory
+from concurrent.futures import ProcessPoolExecutor # For the local process backend
+
+import numpy as np # For comparing the results
+import pandas as pd # For data manipulation
+
+from .aggregations import AGGREGATE_COLUMNS, aggregate_chunks
+from .data_loader import DEFAULT_CHUNKSIZE, TEXT_COLUMNS, iter_dataset
+from .dataset_cache import clean_chunk, iter_cached
+from .distributions import DISTRIBUTION_COLUMNS, count_chunks
+from .instrumentation import count_rows, stage
+from .trend_cube import CUBE_COLUMNS, GRANULARITIES, cube_chunks
+from .word_counts import count_words
+
+# Extensions of the files read as shards
+SHARD_FORMATS = ('.parquet', '.csv')
+
+
+def list_shards(source):
+    """The shard files of ``source``, in sorted order.
+
+    ``source`` is a shard file, a directory searched recursively for
+    Parquet and CSV files, a glob, or a list of any of those.
+    """
+    if isinstance(source, (list, tuple)):
+        return [shard for item in source for shard in list_shards(item)]
+    if os.path.isdir(source):
+        shards = [os.path.join(root, name) for root, _, names in os.walk(source)
+                  for name in names if name.endswith(SHARD_FORMATS)]
+    elif os.path.isfile(source):
+        shards = [source]
+    else:
+        shards = glob.glob(source, recursive=True)
+    if not shards:
+        raise FileNotFoundError(f'No Parquet or CSV shards found at {source!r}')
+    return sorted(shards)
+
+
+def read_shard(path, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield the cleaned rows of one shard in chunks of ``chunksize`` rows."""
+    if path.endswith('.csv'):
+        for chunk in iter_dataset(path, columns=columns, chunksize=chunksize):
+            yield clean_chunk(chunk)
+        return
+    import pyarrow.parquet as pq
+
+    batches = pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize, columns=columns)
+    while True:
+        with stage('read_parquet'):
+            batch = next(batches, None)
+            chunk = clean_chunk(batch.to_pandas()) if batch is not None else None
+            if chunk is not None:
+                count_rows(len(chunk))
+        if chunk is None:
+            return
+        yield chunk
+
+
+def merge_results(total, part):
+    """Merge two partial results: mergeable objects, or dicts of them."""
+    if isinstance(total, dict):
+        for key, value in part.items():
+            total[key] = merge_results(total[key], value) if key in total else value
+        return total
+    return total.merge(part)
+
+
+def run_task(task, path, columns=None, chunksize=DEFAULT_CHUNKSIZE, where=None):
+    """Run ``task`` on the chunks of shard ``path``, returning its partial result.
+
+    With ``where`` (a :class:`~dataset_index.RowFilter`), only the rows it
+    keeps are passed on, found by scanning the shard.
+    """
+    if where is None:
+        return task(read_shard(path, columns=columns, chunksize=chunksize))
+    read = None if columns is None else list(columns) + [col for col in where.columns if col not in columns]
+    return task(where.apply(read_shard(path, columns=read, chunksize=chunksize), columns))
+
+
+class LocalBackend:
+    """Runs the tasks one shard after the other, in this process."""
+
+    def map_reduce(self, task, shards, columns=None, chunksize=DEFAULT_CHUNKSIZE, where=None):
+        """Run ``task`` on every shard and merge the partial results, in shard order."""
+        result = None
+        for path in shards:
+            part = run_task(task, path, columns, chunksize, where)
+            with stage('merge'):
+                result = part if result is None else merge_results(result, part)
+        return result
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ProcessBackend(LocalBackend):
+    """Runs the tasks on a pool of ``workers`` local processes (one per core by default).
+
+    The pool is started by the first map-reduce and kept until :meth:`close`.
+    Tasks must be picklable: module-level functions, or partials of them.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self._pool = None
+
+    def map_reduce(self, task, shards, columns=None, chunksize=DEFAULT_CHUNKSIZE, where=None):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        futures = [self._pool.submit(run_task, task, path, columns, chunksize, where) for path in shards]
+        result = None
+        for future in futures:
+            part = future.result()
+            with stage('merge'):
+                result = part if result is None else merge_results(result, part)
+        return result
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class DaskBackend(LocalBackend):
+    """Runs the tasks on a ``dask.distributed`` cluster.
+
+    Connects to the scheduler at ``scheduler`` (e.g. ``tcp://10.0.0.1:8786``)
+    or, without one, starts a local cluster of ``workers`` processes. Every
+    worker must be able to read the shards at the same paths, and to import
+    the modules of this repository.
+    """
+
+    def __init__(self, scheduler=None, workers=None):
+        try:
+            from dask.distributed import Client
+        except ImportError as error:
+            raise ImportError('The dask backend needs dask[distributed]') from error
+        if scheduler is not None:
+            self.client = Client(scheduler)
+        else:
+            self.client = Client(n_workers=workers, processes=True)
+
+    def map_reduce(self, task, shards, columns=None, chunksize=DEFAULT_CHUNKSIZE, where=None):
+        futures = self.client.map(run_task, [task] * len(shards), shards,
+                                  columns=columns, chunksize=chunksize, where=where, pure=False)
+        # Merge neighbouring results level by level, keeping the shard order
+        while len(futures) > 1:
+            merged = [self.client.submit(merge_results, futures[i], futures[i + 1], pure=False)
+                      for i in range(0, len(futures) - 1, 2)]
+            futures = merged + futures[len(merged) * 2:]
+        with stage('merge'):
+            return futures[0].result() if futures else None
+
+    def close(self):
+        self.client.close()
+
+
+BACKENDS = {
+    'local': LocalBackend,
+    'processes': ProcessBackend,
+    'dask': DaskBackend,
+}
+
+
+def make_backend(name, workers=None, scheduler=None):
+    """The backend called ``name``, with its options."""
+    if name == 'local':
+        return LocalBackend()
+    if name == 'processes':
+        return ProcessBackend(workers)
+    if name == 'dask':
+        return DaskBackend(scheduler, workers)
+    raise ValueError(f'Unknown backend {name!r} (choose from {", ".join(BACKENDS)})')
+
+
+def add_arguments(parser):
+    """Add the backend options to a command line ``parser``."""
+    group = parser.add_argument_group('execution backend')
+    group.add_argument('--backend', choices=list(BACKENDS),
+                       help='read --dataset as shards (a directory, glob or file of Parquet/CSV shards) '
+                            'and run the aggregations on this backend')
+    group.add_argument('--workers', type=int, default=None,
+                       help='worker processes of the processes and local dask backends (default: one per core), '
+                            'or of the text sections without a backend (default: 1)')
+    group.add_argument('--scheduler', help='address of the dask scheduler (default: start a local cluster)')
+
+
+def split_dataset(path, output_dir, rows_per_shard, format='parquet'):
+    """Split the dataset at ``path`` into shards of ``rows_per_shard`` rows, returning their paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index, chunk in enumerate(iter_cached(path, chunksize=rows_per_shard)):
+        paths.append(os.path.join(output_dir, f'part-{index:05d}.{format}'))
+        if format == 'parquet':
+            chunk.to_parquet(paths[-1], index=False)
+        else:
+            chunk.to_csv(paths[-1], index=False)
+    return paths
+
+
+# The map-reduce jobs behind sections 4.1 to 4.4, as (task, columns read)
+JOBS = {
+    'aggregates': (aggregate_chunks, AGGREGATE_COLUMNS),
+    'value_counts': (count_chunks, DISTRIBUTION_COLUMNS),
+    'word_counts': (count_words, TEXT_COLUMNS),
+    'cube': (cube_chunks, CUBE_COLUMNS),
+}
+
+
+def verify(backend, shards, rtol=1e-12):
+    """Check that every job gives the same results on ``backend`` as in one pass over all shards.
+
+    Returns the names of the results that differ.
+    """
+    mismatches = []
+    for name, (task, columns) in JOBS.items():
+        expected = task(chunk for path in shards for chunk in read_shard(path, columns=columns))
+        result = backend.map_reduce(task, shards, columns=columns)
+        for key, expected_table, table in _tables(name, expected, result):
+            if not _equal(expected_table, table, rtol):
+                mismatches.append(f'{name}.{key}')
+    return mismatches
+
+
+def _tables(name, expected, result):
+    if name == 'aggregates':
+        reports, expected_reports = result.reports(), expected.reports()
+        return [(key, expected_reports[key], reports[key]) for key in reports]
+    if name == 'value_counts':
+        return [(col, expected.value_counts(col), result.value_counts(col)) for col in expected.counts] + \
+            [(key, pd.concat(expected.group_value_counts(key)), pd.concat(result.group_value_counts(key)))
+             for key in expected.group_counts]
+    if name == 'cube':
+        return [(granularity, expected.trend(granularity), result.trend(granularity))
+                for granularity in GRANULARITIES]
+    return [(col, pd.Series(expected[col].frequencies()), pd.Series(result[col].frequencies()))
+            for col in expected]
+
+
+def _equal(expected, result, rtol):
+    if expected.shape != result.shape or not expected.index.equals(result.index):
+        return False
+    return np.allclose(expected.to_numpy(dtype='float64'), result.to_numpy(dtype='float64'),
+                       rtol=rtol, atol=0, equal_nan=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    split = commands.add_parser('split', help='split a dataset into Parquet or CSV shards')
+    split.add_argument('dataset', help='path of the feedback CSV')
+    split.add_argument('output_dir')
+    split.add_argument('--rows', type=int, default=DEFAULT_CHUNKSIZE, help='rows per shard')
+    split.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    check = commands.add_parser('verify', help='check a backend against one pass over the shards')
+    check.add_argument('shards', help='directory, glob or file of shards')
+    add_arguments(check)
+    args = parser.parse_args(argv)
+
+    if args.command == 'split':
+        paths = split_dataset(args.dataset, args.output_dir, args.rows, args.format)
+        print(f'Wrote {len(paths)} shards to {args.output_dir}')
+        return
+    shards = list_shards(args.shards)
+    with make_backend(args.backend or 'processes', args.workers, args.scheduler) as backend:
+        mismatches = verify(backend, shards)
+    if mismatches:
+        parser.exit(1, f'Results differ from one pass over the shards: {", ".join(mismatches)}\n')
+    print(f'All results match one pass over {len(shards)} shards')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Command line interface: run sections of the analysis by name.
+
+Each section's tables are printed and its figures shown, or saved to
+``--output-dir`` on the headless Agg backend. Plotting libraries are only
+imported once a figure is drawn, and seaborn and wordcloud only by the
+figures that use them.
+
+Usage::
+
+    python -m employee_sentiment [section ...] [--dataset Dataset.csv] [--output-dir DIR]
+
+With ``--metrics stages.json`` (or ``stages.prom``), the wall time, CPU
+time, peak RSS and rows of every stage of the run are written at its end
+(see :mod:`instrumentation`).
+
+With ``--backend``, ``--dataset`` names Parquet or CSV shards instead, and
+the sections of 4.1 to 4.4 run shard by shard on a local process pool or a
+Dask cluster (see :mod:`backends`)::
+
+    python -m employee_sentiment bivariate temporal --dataset shards/ --backend processes --workers 8
+
+Without a backend, ``--workers`` tokenizes and scores the comments of the
+text sections on that many cores::
+
+    python -m employee_sentiment word_frequency sentiment --workers 4
+
+The ``--location``, ``--engagement``, ``--min-tenure``/``--max-tenure``
+and ``--start``/``--end``/``--period`` options restrict every section to
+the rows they keep (see :mod:`dataset_index`)::
+
+    python -m employee_sentiment bivariate word_frequency --location CityA --period 2023Q3
+
+With ``--preview [ROWS]`` or ``--time-budget SECONDS``, the sections run on
+a stratified sample of the rows instead, and report confidence intervals
+for their means and correlations (see :mod:`employee_sentiment.preview`)::
+
+    python -m employee_sentiment --preview 50000
+    python -m employee_sentiment bivariate temporal --time-budget 5
+
+With ``--comment-cache``, the per-comment results of the text sections are
+kept across runs (see :mod:`text_cache`). The vectorized text stages
+recompute a comment about as fast as the cache looks it up, so it only
+pays off on corpora where the same comments come back run after run.
+"""
+
+import argparse # For the command line interface
+import contextlib # For opening the comment cache only when needed
+
+from . import backends, dataset_index
+from . import preview as previews
+from .instrumentation import add_arguments, instrumented, stage
+from .sections import DATASET_PATH, SECTIONS, open_comment_cache, run, takes
+from .trend_cube import GRANULARITIES
+
+
+def print_tables(tables):
+    for name, table in tables.items():
+        print(f'{name}:')
+        print(table)
+        print()
+
+
+def show_figures(figure_data):
+    """Draw every figure of ``figure_data`` and show them."""
+    import matplotlib.pyplot as plt
+    from .figures import FIGURES
+
+    for name, args in figure_data.items():
+        with stage(f'draw.{name}'):
+            FIGURES[name](*args)
+    plt.show()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('sections', nargs='*', metavar='section',
+                        help=f'sections to run, in the order given (default: all of {", ".join(SECTIONS)})')
+    parser.add_argument('--dataset', default=DATASET_PATH, help='path of the feedback CSV')
+    parser.add_argument('--output-dir', help='save the figures to this directory instead of showing them')
+    parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg'], dest='formats')
+    parser.add_argument('--raw-distributions', action='store_false', dest='binned',
+                        help='draw the histograms and boxplots from every row instead of value counts')
+    parser.add_argument('--granularity', choices=list(GRANULARITIES), default='W',
+                        help='period of the rating trends: day, week, month or quarter')
+    parser.add_argument('--comment-cache', action='store_true',
+                        help='keep the per-comment results of the text sections across runs')
+    add_arguments(parser)
+    dataset_index.add_arguments(parser)
+    backends.add_arguments(parser)
+    previews.add_arguments(parser)
+    args = parser.parse_args(argv)
+    where = dataset_index.filter_from_args(args, parser)
+    names = args.sections or list(SECTIONS)
+    unknown = [name for name in names if name not in SECTIONS]
+    if unknown:
+        parser.error(f'unknown sections: {", ".join(unknown)} (choose from {", ".join(SECTIONS)})')
+    if where is not None and args.backend is None:
+        try:
+            dataset_index.check_filter(args.dataset, where)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.profile and args.profile_dir is None:
+        parser.error('--profile needs --profile-dir')
+    previewing = args.preview is not None or args.time_budget is not None
+    if args.backend is not None and not previewing:
+        unsupported = [name for name in names if not takes(name, 'backend')]
+        if unsupported:
+            parser.error(f'sections {", ".join(unsupported)} do not run on a backend')
+        if not args.binned:
+            parser.error('--raw-distributions cannot be used with --backend')
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(instrumented(args))
+        cache = backend = preview = None
+        if args.backend is not None:
+            try:
+                backend = stack.enter_context(backends.make_backend(args.backend, args.workers, args.scheduler))
+            except ImportError as error:
+                parser.error(str(error))
+        elif args.comment_cache and any(takes(name, 'cache') for name in names):
+            cache = stack.enter_context(open_comment_cache(args.dataset))
+        options = {'cache': cache, 'binned': args.binned, 'granularity': args.granularity,
+                   'workers': args.workers or 1}
+        if previewing:
+            try:
+                preview = previews.Preview.draw(args.dataset, args.preview or previews.DEFAULT_ROWS, args.seed,
+                                                backend, where)
+            except dataset_index.NoRowsError as error:
+                print(error)
+                return
+            if args.time_budget is not None:
+                rows = previews.budget_rows(preview, names, args.time_budget, **options)
+                if rows < len(preview.sample):
+                    preview = preview.subsample(rows)
+            print_tables({'preview': preview.summary()})
+        for name in names:
+            try:
+                if preview is not None:
+                    result = preview.run(name, **options)
+                else:
+                    result = run(name, args.dataset, backend=backend, where=where, **options)
+            except dataset_index.NoRowsError as error:
+                print(f'{name}: {error}\n')
+                continue
+            print_tables(result['tables'])
+            if not result['figures']:
+                continue
+            if args.output_dir is None:
+                show_figures(result['figures'])
+            else:
+                from .report import render_report
+                for path in render_report(result['figures'], args.output_dir, args.formats, workers=1):
+                    print(path)
+
+
+if __name__ == '__main__':
+    main()
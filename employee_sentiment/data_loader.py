@@ -0,0 +1,115 @@
+"""Typed, chunked loading of the employee feedback dataset.
+
+The survey export is declared once here so every part of the analysis reads
+it the same way: star and satisfaction ratings as small nullable integers,
+the two categorical fields as ``category`` columns and ``Feedback_Date``
+parsed while reading. Reads can be restricted to a subset of columns and streamed in
+chunks so a section never has to hold more of the file than it uses.
+"""
+
+import pandas as pd # For data manipulation
+from pandas.api.types import union_categoricals
+
+from .instrumentation import count_rows, stage
+
+# Columns holding free text comments
+TEXT_COLUMNS = ['Comment_Positives', 'Comment_Negatives', 'Advice_To_Mgmt']
+
+# Columns holding star/satisfaction ratings on a 1 to 5 scale
+RATING_COLUMNS = [
+    'Overall_Ratings', 'Work_Balance_Stars', 'Culture_Values_Stars',
+    'Career_Opportunities_Stars', 'Comp_Benefit_Stars', 'Senior_Management_Stars',
+    'Career_Growth_Opportunities_Stars', 'Wellness_Programs_Satisfaction', 'Remote_Work_Satisfaction'
+]
+
+# Numerical columns, in the order the univariate analysis plots them
+NUMERICAL_COLUMNS = RATING_COLUMNS[:6] + ['Employee_Tenure'] + RATING_COLUMNS[6:]
+
+CATEGORICAL_COLUMNS = ['Employee_Engagement_Activities', 'Location']
+
+DATE_COLUMN = 'Feedback_Date'
+
+# Declared dtypes. The date is parsed separately and the text columns keep
+# pandas' default string dtype. Ratings and tenures are nullable, so that a
+# skipped question reads as missing
+SCHEMA = {
+    'ID': 'int64',
+    **{col: 'Int8' for col in RATING_COLUMNS},
+    'Employee_Tenure': 'Int8',
+    'Employee_Engagement_Activities': 'category',
+    'Location': 'category',
+}
+
+COLUMNS = ['ID'] + TEXT_COLUMNS + RATING_COLUMNS[:6] + CATEGORICAL_COLUMNS[:1] + \
+    ['Employee_Tenure', 'Location', DATE_COLUMN] + RATING_COLUMNS[6:]
+
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def _read_options(columns):
+    """Build the ``pd.read_csv`` keyword arguments for a column projection."""
+    if columns is None:
+        columns = COLUMNS
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f'Unknown columns: {sorted(unknown)}')
+    return {
+        'usecols': list(columns),
+        'dtype': {col: SCHEMA[col] for col in columns if col in SCHEMA},
+    }
+
+
+def _parse_dates(frame):
+    """Parse ``Feedback_Date`` in place, if the frame has it."""
+    if DATE_COLUMN in frame.columns:
+        with stage('parse_dates'):
+            frame[DATE_COLUMN] = pd.to_datetime(frame[DATE_COLUMN], format='ISO8601')
+            count_rows(len(frame))
+    return frame
+
+
+def iter_dataset(path, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield the dataset as typed DataFrame chunks of at most ``chunksize`` rows.
+
+    Only ``columns`` are read from the file (all of them by default). Each
+    chunk carries its own categories for the categorical columns; use
+    :func:`concat_chunks` to combine chunks into one frame.
+    """
+    reader = pd.read_csv(path, chunksize=chunksize, **_read_options(columns))
+    with reader:
+        while True:
+            with stage('read_csv'):
+                chunk = next(reader, None)
+                if chunk is not None:
+                    count_rows(len(chunk))
+            if chunk is None:
+                return
+            yield _parse_dates(chunk)
+
+
+def concat_chunks(chunks):
+    """Concatenate typed chunks, keeping categorical columns categorical.
+
+    ``pd.concat`` falls back to ``object`` when chunks disagree on their
+    categories, so those columns are unioned explicitly.
+    """
+    chunks = list(chunks)
+    frame = pd.concat(chunks, ignore_index=True)
+    for col in CATEGORICAL_COLUMNS:
+        if col in frame.columns and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = union_categoricals([chunk[col] for chunk in chunks], sort_categories=True)
+    return frame
+
+
+def load_dataset(path, columns=None, chunksize=DEFAULT_CHUNKSIZE, nrows=None):
+    """Load the dataset (or just ``columns`` of it) into a single typed frame.
+
+    The file is read in chunks so the untyped intermediate never exists for
+    the whole file at once.
+    """
+    if nrows is not None:
+        return _parse_dates(pd.read_csv(path, nrows=nrows, **_read_options(columns)))
+    chunks = list(iter_dataset(path, columns=columns, chunksize=chunksize))
+    if not chunks:
+        return load_dataset(path, columns=columns, nrows=0)
+    return concat_chunks(chunks)
@@ -0,0 +1,263 @@
+"""Persistent Parquet cache of the cleaned, typed dataset.
+
+Parsing the CSV export is by far the slowest part of a run, so the first load
+writes the cleaned frame (typed by :mod:`data_loader`, comment columns
+coerced to text) to a Parquet file next to the source. Later loads read only
+the requested columns from that file, memory-mapped.
+
+The cache is keyed by the source file's size, modification time and SHA-256
+digest. A changed size rebuilds the cache straight away; a changed mtime with
+an unchanged size re-hashes the file and only rebuilds when the content
+differs, so touching the CSV does not cost a full re-parse.
+
+Parquet support comes from ``pyarrow``. Without it the loaders fall back to
+reading the CSV directly.
+"""
+
+import hashlib # For hashing the source file
+import json # For the cache metadata
+import os # For file metadata and atomic renames
+import tempfile # For the files being written
+
+import pandas as pd # For data manipulation
+
+from .data_loader import TEXT_COLUMNS, DEFAULT_CHUNKSIZE, iter_dataset, concat_chunks
+from .instrumentation import count_rows, stage
+
+CACHE_DIR_NAME = '.dataset_cache'
+
+# Bump whenever the cleaning steps or the schema change, to invalidate old caches
+CACHE_VERSION = 2
+
+_HASH_BLOCKSIZE = 1 << 20
+
+
+def clean_chunk(chunk):
+    """Apply the cleaning steps of the analysis to a typed chunk.
+
+    Missing comments become empty strings so the text columns can be joined
+    and tokenized without a per-use ``.astype(str)``.
+    """
+    for col in TEXT_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].fillna('').astype(str)
+    return chunk
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCKSIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_paths(path, cache_dir=None):
+    """Return the ``(parquet, metadata)`` paths of the cache for ``path``."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{stem}.parquet'), os.path.join(cache_dir, f'{stem}.json')
+
+
+def _is_appended(path, size, sha256):
+    """Whether the file at ``path`` starts with the ``size`` bytes of digest ``sha256``, ending a line."""
+    if os.path.getsize(path) < size:
+        return False
+    digest = hashlib.sha256()
+    last = b''
+    with open(path, 'rb') as handle:
+        remaining = size
+        while remaining:
+            block = handle.read(min(_HASH_BLOCKSIZE, remaining))
+            if not block:
+                return False
+            digest.update(block)
+            remaining -= len(block)
+            last = block[-1:]
+    return last == b'\n' and digest.hexdigest() == sha256
+
+
+def covered_rows(path, derived, cache_dir=None):
+    """How many leading rows of the dataset at ``path`` a file derived from it still holds, or None.
+
+    ``derived`` is the metadata saved with the derived file: the ``sha256``,
+    ``size`` and ``rows`` of the dataset it was built from. It holds every
+    row while the dataset is unchanged, and the rows it was built from when
+    whole lines have only been appended to the dataset since. Otherwise it
+    must be rebuilt, and None is returned.
+    """
+    meta = ensure_cache(path, cache_dir)
+    if derived.get('sha256') == meta['sha256']:
+        return meta['rows']
+    if 'size' in derived and 'rows' in derived and _is_appended(path, derived['size'], derived['sha256']):
+        return derived['rows']
+    return None
+
+
+def _read_metadata(meta_path):
+    try:
+        with open(meta_path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _temp_path(path, suffix='.tmp'):
+    """A new temporary file next to ``path``, to write and then move over ``path``.
+
+    Every writer gets a file of its own, so writers of the same cache file
+    at the same time cannot move each other's half-written files.
+    """
+    handle, tmp_path = tempfile.mkstemp(suffix=suffix, prefix=os.path.basename(path) + '.',
+                                        dir=os.path.dirname(os.path.abspath(path)))
+    os.close(handle)
+    return tmp_path
+
+
+def _write_json(meta_path, meta):
+    tmp_path = _temp_path(meta_path)
+    with open(tmp_path, 'w') as handle:
+        json.dump(meta, handle, indent=2)
+    os.replace(tmp_path, meta_path)
+
+
+def _is_fresh(path, parquet_path, meta_path, meta):
+    """Check ``meta`` against the source file, refreshing a stale mtime in place."""
+    if meta is None or meta.get('version') != CACHE_VERSION or not os.path.exists(parquet_path):
+        return False
+    stat = os.stat(path)
+    if stat.st_size != meta['size']:
+        return False
+    if stat.st_mtime_ns == meta['mtime_ns']:
+        return True
+    if file_digest(path) != meta['sha256']:
+        return False
+    meta['mtime_ns'] = stat.st_mtime_ns
+    _write_json(meta_path, meta)
+    return True
+
+
+def _build(path, parquet_path, meta_path, chunksize):
+    """Parse the CSV chunk by chunk into a new Parquet cache."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    stat = os.stat(path)
+    digest = file_digest(path)
+
+    tmp_path = _temp_path(parquet_path)
+    writer = None
+    rows = 0
+    missing = None
+    try:
+        for chunk in iter_dataset(path, chunksize=chunksize):
+            counts = chunk.isnull().sum()
+            missing = counts if missing is None else missing + counts
+            table = pa.Table.from_pandas(clean_chunk(chunk), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f'{path} contains no rows')
+    os.replace(tmp_path, parquet_path)
+
+    meta = {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest,
+        'rows': rows,
+        'missing': {col: int(count) for col, count in missing.items()},
+    }
+    _write_json(meta_path, meta)
+    return meta
+
+
+def ensure_cache(path, cache_dir=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Build the cache for ``path`` if it is missing or stale.
+
+    Returns the cache metadata: the source fingerprint, the row count and the
+    number of missing values per column in the source.
+    """
+    parquet_path, meta_path = cache_paths(path, cache_dir)
+    meta = _read_metadata(meta_path)
+    if _is_fresh(path, parquet_path, meta_path, meta):
+        return meta
+    with stage('cache_build'):
+        meta = _build(path, parquet_path, meta_path, chunksize)
+        count_rows(meta['rows'])
+    return meta
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow.parquet # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def missing_counts(path, cache_dir=None):
+    """The number of missing values per column of the source ``path``, before cleaning."""
+    if not _has_pyarrow():
+        return sum(chunk.isnull().sum() for chunk in iter_dataset(path))
+    return pd.Series(ensure_cache(path, cache_dir)['missing'])
+
+
+def load_cached(path, columns=None, cache_dir=None):
+    """Load the cleaned dataset (or just ``columns`` of it) through the cache."""
+    if not _has_pyarrow():
+        return concat_chunks(clean_chunk(chunk) for chunk in iter_dataset(path, columns=columns))
+    ensure_cache(path, cache_dir)
+    parquet_path, _ = cache_paths(path, cache_dir)
+    with stage('read_parquet'):
+        frame = pd.read_parquet(parquet_path, columns=columns, memory_map=True)
+        count_rows(len(frame))
+    return frame
+
+
+def iter_cached(path, columns=None, chunksize=DEFAULT_CHUNKSIZE, cache_dir=None, first_row=0):
+    """Yield the cleaned dataset through the cache in chunks of ``chunksize`` rows, from row ``first_row`` on."""
+    if not _has_pyarrow():
+        for chunk in iter_dataset(path, columns=columns, chunksize=chunksize):
+            if first_row >= len(chunk):
+                first_row -= len(chunk)
+                continue
+            yield clean_chunk(chunk.iloc[first_row:])
+            first_row = 0
+        return
+    import pyarrow.parquet as pq
+
+    ensure_cache(path, cache_dir)
+    parquet_path, _ = cache_paths(path, cache_dir)
+    parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+    # Row groups before the first row are not read
+    groups = []
+    for group in range(parquet_file.num_row_groups):
+        size = parquet_file.metadata.row_group(group).num_rows
+        if first_row >= size and not groups:
+            first_row -= size
+        else:
+            groups.append(group)
+    batches = parquet_file.iter_batches(batch_size=chunksize, row_groups=groups, columns=columns)
+    while True:
+        with stage('read_parquet'):
+            batch = next(batches, None)
+            if batch is not None and first_row:
+                skip = min(first_row, batch.num_rows)
+                batch, first_row = batch.slice(skip), first_row - skip
+            chunk = batch.to_pandas() if batch is not None else None
+            if chunk is not None:
+                count_rows(len(chunk))
+        if chunk is None:
+            return
+        if len(chunk):
+            yield chunk
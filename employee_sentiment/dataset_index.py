@@ -0,0 +1,417 @@
+"""Indexed row filters over the cached dataset.
+
+Analysts ask for the sections restricted to some rows ("location X in Q3").
+A :class:`RowFilter` names those rows by location, engagement, a tenure
+range and a date range. Filtering the rows by hand would mean loading and
+scanning every column a filter uses, every time. Instead, a
+:class:`DatasetIndex` is built once per dataset cache and kept next to it:
+
+- the row numbers sorted by ``Feedback_Date`` and by ``Employee_Tenure``,
+  with the sorted values, so a date or tenure range is two binary searches
+  and a slice of row numbers,
+- a bitmap of the rows of each ``Location`` and each
+  ``Employee_Engagement_Activities`` value, packed eight rows a byte, so
+  a set of values is the OR of their bitmaps.
+
+A filter resolves to the AND of its bitmaps, as sorted row numbers. The
+rows are then read from the Parquet cache by row group, skipping the row
+groups without selected rows and converting only the selected rows to
+pandas. Shards, which have no index, are filtered chunk by chunk with
+:meth:`RowFilter.apply`.
+"""
+
+import os # For the index file next to the dataset cache
+
+import numpy as np # For the sorted indexes and bitmaps
+import pandas as pd # For data manipulation
+
+from .data_loader import CATEGORICAL_COLUMNS, DATE_COLUMN, concat_chunks
+from .dataset_cache import _temp_path, cache_paths, ensure_cache, iter_cached, load_cached
+from .instrumentation import count_rows, stage
+
+TENURE_COLUMN = 'Employee_Tenure'
+
+# Every column the index reads
+INDEX_COLUMNS = [DATE_COLUMN, TENURE_COLUMN] + CATEGORICAL_COLUMNS
+
+# Bump whenever the index layout changes, to invalidate old indexes
+INDEX_VERSION = 1
+
+
+class NoRowsError(ValueError):
+    """A row filter keeps no rows of the dataset."""
+
+
+def _drop_unused_categories(chunk):
+    """Drop the categories of the rows filtered out, as if they had never been read."""
+    for col in CATEGORICAL_COLUMNS:
+        if col in chunk.columns and isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = chunk[col].cat.remove_unused_categories()
+    return chunk
+
+
+def _values(values):
+    if values is None:
+        return None
+    return [values] if isinstance(values, str) else list(values)
+
+
+class RowFilter:
+    """The rows of the given locations and engagement answers, tenure range and days.
+
+    ``location`` and ``engagement`` are a value or a list of values; the
+    tenure bounds and the ``start`` and ``end`` days are included. Criteria
+    left as None keep every row.
+    """
+
+    def __init__(self, location=None, engagement=None, min_tenure=None, max_tenure=None, start=None, end=None):
+        self.categories = {
+            col: values for col, values in [('Location', _values(location)),
+                                            ('Employee_Engagement_Activities', _values(engagement))]
+            if values is not None
+        }
+        self.min_tenure = min_tenure
+        self.max_tenure = max_tenure
+        self.start = pd.Timestamp(start) if start is not None else None
+        self.end = pd.Timestamp(end) if end is not None else None
+
+    def __repr__(self):
+        criteria = [f'{col} in {values}' for col, values in self.categories.items()]
+        if self.min_tenure is not None or self.max_tenure is not None:
+            criteria.append(f'{self.min_tenure} <= {TENURE_COLUMN} <= {self.max_tenure}')
+        if self.start is not None or self.end is not None:
+            criteria.append(f'{self.start} <= {DATE_COLUMN} <= {self.end}')
+        return f'RowFilter({", ".join(criteria)})'
+
+    @property
+    def columns(self):
+        """The columns the filter reads."""
+        columns = list(self.categories)
+        if self.min_tenure is not None or self.max_tenure is not None:
+            columns.append(TENURE_COLUMN)
+        if self.start is not None or self.end is not None:
+            columns.append(DATE_COLUMN)
+        return columns
+
+    def _day_bounds(self):
+        """The first and last instants kept, as nanoseconds."""
+        low = self.start.normalize().value if self.start is not None else np.iinfo('int64').min
+        high = self.end.normalize().value + pd.Timedelta(days=1).value - 1 if self.end is not None \
+            else np.iinfo('int64').max
+        return low, high
+
+    def mask(self, chunk):
+        """Which rows of ``chunk`` the filter keeps, by scanning its columns."""
+        keep = np.ones(len(chunk), dtype=bool)
+        for col, values in self.categories.items():
+            keep &= chunk[col].isin(values).to_numpy()
+        if self.min_tenure is not None:
+            keep &= (chunk[TENURE_COLUMN] >= self.min_tenure).to_numpy(dtype=bool, na_value=False)
+        if self.max_tenure is not None:
+            keep &= (chunk[TENURE_COLUMN] <= self.max_tenure).to_numpy(dtype=bool, na_value=False)
+        if self.start is not None or self.end is not None:
+            low, high = self._day_bounds()
+            dates = chunk[DATE_COLUMN].to_numpy(dtype='datetime64[ns]').view('int64')
+            keep &= (dates >= low) & (dates <= high)
+        return keep
+
+    def apply(self, chunks, columns=None):
+        """Yield the kept rows of ``chunks``, with only ``columns`` (all by default)."""
+        for chunk in chunks:
+            chunk = _drop_unused_categories(chunk[self.mask(chunk)])
+            yield chunk if columns is None else chunk[list(columns)]
+
+    def cube_where(self):
+        """The filter as ``(where, start, end)`` of :meth:`trend_cube.TrendCube.trend`, or None with a tenure range."""
+        if self.min_tenure is not None or self.max_tenure is not None:
+            return None
+        return dict(self.categories), self.start, self.end
+
+
+class SortedIndex:
+    """The row numbers of a column, sorted by value."""
+
+    def __init__(self, values, rows):
+        self.values = values
+        self.rows = rows
+
+    @classmethod
+    def build(cls, column, present=None):
+        """Index the values of ``column``, leaving out the rows where ``present`` is False."""
+        rows = np.argsort(column, kind='stable')
+        if present is not None:
+            rows = rows[present[rows]]
+        rows = rows.astype(_row_dtype(len(column)))
+        return cls(column[rows], rows)
+
+    def between(self, low=None, high=None):
+        """The row numbers of the values in ``[low, high]``, unsorted."""
+        first = 0 if low is None else np.searchsorted(self.values, low, side='left')
+        last = len(self.values) if high is None else np.searchsorted(self.values, high, side='right')
+        return self.rows[first:last]
+
+
+def _row_dtype(rows):
+    return 'int32' if rows < 2 ** 31 else 'int64'
+
+
+class DatasetIndex:
+    """Sorted date and tenure indexes and categorical bitmaps over the rows of the dataset."""
+
+    def __init__(self, rows, dates, tenure, bitmaps):
+        self.rows = rows
+        self.dates = dates
+        self.tenure = tenure
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def build(cls, frame):
+        """Index ``frame``, which has the :data:`INDEX_COLUMNS`."""
+        dates = frame[DATE_COLUMN].to_numpy(dtype='datetime64[ns]').view('int64')
+        bitmaps = {}
+        for col in CATEGORICAL_COLUMNS:
+            codes, uniques = pd.factorize(frame[col], sort=True)
+            bitmaps[col] = {str(value): np.packbits(codes == code) for code, value in enumerate(uniques)}
+        # Rows without a tenure are in no tenure range
+        tenure = SortedIndex.build(frame[TENURE_COLUMN].to_numpy(dtype='int8', na_value=0),
+                                   frame[TENURE_COLUMN].notna().to_numpy())
+        return cls(len(frame), SortedIndex.build(dates), tenure, bitmaps)
+
+    def _range_bitmap(self, rows):
+        keep = np.zeros(self.rows, dtype=bool)
+        keep[rows] = True
+        return np.packbits(keep)
+
+    def check(self, row_filter):
+        """Raise a ValueError if ``row_filter`` asks for a location or engagement answer absent from the dataset."""
+        for col, values in row_filter.categories.items():
+            unknown = [value for value in values if value not in self.bitmaps[col]]
+            if unknown:
+                raise ValueError(f'Unknown {col} {", ".join(map(repr, unknown))} '
+                                 f'(choose from {", ".join(self.bitmaps[col])})')
+
+    def select(self, row_filter):
+        """The sorted row numbers ``row_filter`` keeps, after :meth:`check`-ing it."""
+        self.check(row_filter)
+        with stage('index_select'):
+            bitmap = None
+            for col, values in row_filter.categories.items():
+                chosen = np.zeros((self.rows + 7) // 8, dtype='uint8')
+                for value in values:
+                    chosen |= self.bitmaps[col][value]
+                bitmap = chosen if bitmap is None else bitmap & chosen
+            ranges = []
+            if row_filter.min_tenure is not None or row_filter.max_tenure is not None:
+                ranges.append(self.tenure.between(row_filter.min_tenure, row_filter.max_tenure))
+            if row_filter.start is not None or row_filter.end is not None:
+                ranges.append(self.dates.between(*row_filter._day_bounds()))
+            if bitmap is None and len(ranges) == 1:
+                # A single range needs no bitmap
+                rows = np.sort(ranges[0])
+            else:
+                for part in ranges:
+                    bitmap = self._range_bitmap(part) if bitmap is None else bitmap & self._range_bitmap(part)
+                rows = np.arange(self.rows) if bitmap is None else np.flatnonzero(np.unpackbits(bitmap, count=self.rows))
+            count_rows(len(rows))
+            return rows.astype(_row_dtype(self.rows))
+
+    def save(self, path, **metadata):
+        """Write the index to the ``.npz`` file ``path``, atomically."""
+        arrays = {
+            'rows': np.array(self.rows),
+            'dates_values': self.dates.values, 'dates_rows': self.dates.rows,
+            'tenure_values': self.tenure.values, 'tenure_rows': self.tenure.rows,
+        }
+        for col, bitmaps in self.bitmaps.items():
+            for value, bitmap in bitmaps.items():
+                arrays[f'bitmap:{col}:{value}'] = bitmap
+        arrays.update({f'meta:{key}': np.array(value) for key, value in metadata.items()})
+        tmp_path = _temp_path(path, suffix='.npz')
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index and its metadata from ``path``."""
+        with np.load(path) as arrays:
+            bitmaps = {col: {} for col in CATEGORICAL_COLUMNS}
+            metadata = {}
+            for key in arrays.files:
+                if key.startswith('bitmap:'):
+                    _, col, value = key.split(':', 2)
+                    bitmaps[col][value] = arrays[key]
+                elif key.startswith('meta:'):
+                    metadata[key[len('meta:'):]] = arrays[key].item()
+            index = cls(int(arrays['rows']), SortedIndex(arrays['dates_values'], arrays['dates_rows']),
+                        SortedIndex(arrays['tenure_values'], arrays['tenure_rows']), bitmaps)
+        return index, metadata
+
+
+def ensure_index(path, cache_dir=None):
+    """The index of the dataset at ``path``, kept with its dataset cache and rebuilt when the dataset changes."""
+    meta = ensure_cache(path, cache_dir)
+    index_path = os.path.splitext(cache_paths(path, cache_dir)[0])[0] + '.index.npz'
+    if os.path.exists(index_path):
+        index, index_meta = DatasetIndex.load(index_path)
+        if index_meta.get('version') == INDEX_VERSION and index_meta.get('sha256') == meta['sha256']:
+            return index
+    with stage('index_build'):
+        index = DatasetIndex.build(load_cached(path, columns=INDEX_COLUMNS, cache_dir=cache_dir))
+        count_rows(index.rows)
+    index.save(index_path, version=INDEX_VERSION, sha256=meta['sha256'])
+    return index
+
+
+def _parquet_file(path, cache_dir):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    ensure_cache(path, cache_dir)
+    return pq.ParquetFile(cache_paths(path, cache_dir)[0], memory_map=True)
+
+
+def _with_filter_columns(columns, row_filter):
+    return columns + [col for col in row_filter.columns if col not in columns]
+
+
+def _row_groups(parquet_file, rows, columns):
+    """Yield the Arrow tables of the sorted ``rows`` of ``parquet_file``, one per row group holding some of them.
+
+    The other row groups are not read.
+    """
+    offset = 0
+    for group in range(parquet_file.num_row_groups):
+        size = parquet_file.metadata.row_group(group).num_rows
+        first, last = np.searchsorted(rows, [offset, offset + size])
+        if last > first:
+            with stage('read_parquet'):
+                table = parquet_file.read_row_group(group, columns=columns).take(rows[first:last] - offset)
+                count_rows(table.num_rows)
+            yield table
+        offset += size
+
+
+def iter_filtered(path, columns=None, row_filter=None, cache_dir=None):
+    """Yield the rows of the dataset ``row_filter`` keeps, in chunks, like :func:`dataset_cache.iter_cached`.
+
+    Chunks follow the row groups of the cache; row groups without kept rows
+    are not read.
+    """
+    if row_filter is None:
+        yield from iter_cached(path, columns=columns, cache_dir=cache_dir)
+        return
+    parquet_file = _parquet_file(path, cache_dir)
+    if parquet_file is None:
+        read = None if columns is None else _with_filter_columns(list(columns), row_filter)
+        yield from row_filter.apply(iter_cached(path, columns=read), columns)
+        return
+    rows = ensure_index(path, cache_dir).select(row_filter)
+    for table in _row_groups(parquet_file, rows, columns):
+        yield _drop_unused_categories(table.to_pandas())
+
+
+def load_filtered(path, columns=None, row_filter=None, limit=None, cache_dir=None):
+    """Load the rows of the dataset ``row_filter`` keeps (the first ``limit`` of them), like :func:`load_cached`.
+
+    Only the row groups holding kept rows are read.
+    """
+    parquet_file = _parquet_file(path, cache_dir) if row_filter is not None else None
+    if parquet_file is None:
+        if row_filter is None:
+            frame = load_cached(path, columns=columns, cache_dir=cache_dir)
+        else:
+            frame = concat_chunks(iter_filtered(path, columns, row_filter, cache_dir))
+        return frame if limit is None else frame.iloc[:limit]
+    import pyarrow as pa
+
+    rows = ensure_index(path, cache_dir).select(row_filter)[:limit]
+    tables = list(_row_groups(parquet_file, rows, columns))
+    if not tables:
+        schema = parquet_file.schema_arrow
+        tables = [schema.empty_table() if columns is None else schema.empty_table().select(columns)]
+    return _drop_unused_categories(pa.concat_tables(tables).to_pandas())
+
+
+def check_filter(path, row_filter, cache_dir=None):
+    """Raise a ValueError if ``row_filter`` asks for values absent from the dataset; a no-op without an index."""
+    if _parquet_file(path, cache_dir) is not None:
+        ensure_index(path, cache_dir).check(row_filter)
+
+
+def count_filtered(path, row_filter, cache_dir=None):
+    """The number of rows of the dataset ``row_filter`` keeps, found through the index when there is one."""
+    if _parquet_file(path, cache_dir) is None:
+        return sum(len(chunk) for chunk in row_filter.apply(iter_cached(path, columns=row_filter.columns)))
+    return len(ensure_index(path, cache_dir).select(row_filter))
+
+
+class RowCount:
+    """The number of rows of some chunks, merged across shards like the other partial results."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        return self
+
+
+def row_count_chunks(chunks):
+    """Count the rows of ``chunks`` in a :class:`RowCount`."""
+    counter = RowCount()
+    for chunk in chunks:
+        counter.update(chunk)
+    return counter
+
+
+def add_arguments(parser):
+    """Add the row filter options to a command line ``parser``."""
+    group = parser.add_argument_group('row filter')
+    group.add_argument('--location', nargs='+', help='keep only the feedback from these locations')
+    group.add_argument('--engagement', nargs='+', help='keep only these answers to the engagement question')
+    group.add_argument('--min-tenure', type=int, help='keep only tenures of at least this many years')
+    group.add_argument('--max-tenure', type=int, help='keep only tenures of at most this many years')
+    group.add_argument('--start', help='keep only the feedback from this day on')
+    group.add_argument('--end', help='keep only the feedback up to this day')
+    group.add_argument('--period', help='keep only the feedback of this period, e.g. 2023Q3 or 2023-07')
+
+
+def _parse_filter(args):
+    if args.period is not None and (args.start is not None or args.end is not None):
+        raise ValueError('a period cannot be combined with a start or end day')
+    if args.period is not None:
+        try:
+            period = pd.Period(args.period)
+        except ValueError as error:
+            raise ValueError(f'invalid period {args.period!r}: {error}') from error
+        return period.start_time, period.end_time.normalize()
+    bounds = []
+    for bound, value in [('start', args.start), ('end', args.end)]:
+        try:
+            bounds.append(pd.Timestamp(value) if value is not None else None)
+        except ValueError as error:
+            raise ValueError(f'invalid {bound} day {value!r}: {error}') from error
+    return bounds
+
+
+def filter_from_args(args, parser=None):
+    """The :class:`RowFilter` the options of :func:`add_arguments` ask for, or None to keep every row.
+
+    Invalid days or periods, or a period given with a day, raise a
+    ValueError, or exit through ``parser.error`` when ``parser`` is given.
+    """
+    try:
+        start, end = _parse_filter(args)
+    except ValueError as error:
+        if parser is None:
+            raise
+        parser.error(str(error))
+    row_filter = RowFilter(args.location, args.engagement, args.min_tenure, args.max_tenure, start, end)
+    if not row_filter.columns:
+        return None
+    return row_filter
@@ -0,0 +1,219 @@
+"""Histograms, KDEs and box statistics from value counts.
+
+Sections 4.1.1 and 4.2.3 draw histograms with a KDE of the numerical columns
+and boxplots of the tenure. Handed the raw rows, seaborn bins, smooths and
+sorts every one of them, so the plots get slower with every row. The
+star ratings and the tenure are discrete though, so the counts of their
+values carry everything the plots show:
+
+- the histogram bins are the ones ``bins='auto'`` picks on the raw rows
+  (numpy's Sturges/Freedman-Diaconis rule, whose inputs, the row count, range
+  and quartiles, follow from the counts), and the bin heights are the
+  counts summed per bin,
+- the KDE is fitted on the distinct values weighted by their counts, with
+  the bandwidth Scott's rule gives on the raw rows,
+- the box statistics (quartiles, whiskers, outliers) are exact quantiles
+  of the counts, computed like ``matplotlib.cbook.boxplot_stats``.
+
+Continuous columns can be counted in fixed bins of ``bin_width`` instead of
+per value. :class:`ValueCounter` collects the counts one chunk at a time and
+counters over separate chunks or files are combined with
+:meth:`ValueCounter.merge`, so the plotting cost only depends on the number of
+distinct values or bins.
+"""
+
+import numpy as np # For the quantiles and bin edges
+import pandas as pd # For data manipulation
+
+from .data_loader import CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS
+from .instrumentation import count_rows, stage
+
+# The column whose distribution the boxplots show per category
+BOX_COLUMN = 'Employee_Tenure'
+
+# Every column the counter reads
+DISTRIBUTION_COLUMNS = NUMERICAL_COLUMNS + CATEGORICAL_COLUMNS
+
+
+def count_values(values, bin_width=None):
+    """Number of rows per value of ``values``, sorted by value.
+
+    With ``bin_width``, values are counted per bin ``[k * bin_width, (k + 1) * bin_width)``
+    and each bin is labelled with its center.
+    """
+    values = values.dropna()
+    if bin_width is not None:
+        values = (np.floor(values / bin_width) + 0.5) * bin_width
+    return values.value_counts(sort=False).sort_index().astype('int64')
+
+
+def _accumulate(total, part):
+    if total is None:
+        return part
+    return total.add(part, fill_value=0).astype('int64')
+
+
+class ValueCounter:
+    """Value counts of the numerical columns and of ``BOX_COLUMN`` per category, updated chunk by chunk."""
+
+    def __init__(self, columns=NUMERICAL_COLUMNS, by=CATEGORICAL_COLUMNS, bin_widths=None):
+        self.columns = list(columns)
+        self.by = list(by)
+        self.bin_widths = dict(bin_widths or {})
+        self.counts = {}
+        self.group_counts = {}
+
+    def update(self, chunk):
+        """Add the counts of ``chunk``; columns missing from the chunk are skipped."""
+        for col in self.columns:
+            if col in chunk.columns:
+                self.counts[col] = _accumulate(self.counts.get(col), count_values(chunk[col], self.bin_widths.get(col)))
+        if BOX_COLUMN in chunk.columns:
+            for key in self.by:
+                if key in chunk.columns:
+                    pairs = chunk.groupby(key, observed=True)[BOX_COLUMN].value_counts()
+                    pairs.index = pairs.index.set_levels(
+                        [level.astype(level.categories.dtype) if isinstance(level, pd.CategoricalIndex) else level
+                         for level in pairs.index.levels])
+                    self.group_counts[key] = _accumulate(self.group_counts.get(key), pairs.astype('int64'))
+        return self
+
+    def merge(self, other):
+        """Add the counts of another counter over the same columns."""
+        if other.columns != self.columns or other.bin_widths != self.bin_widths:
+            raise ValueError('Cannot merge counters over different columns or bins')
+        for col, counts in other.counts.items():
+            self.counts[col] = _accumulate(self.counts.get(col), counts)
+        for key, counts in other.group_counts.items():
+            self.group_counts[key] = _accumulate(self.group_counts.get(key), counts)
+        return self
+
+    def value_counts(self, col):
+        """Counts per value (or bin center) of ``col``, sorted by value."""
+        if col not in self.counts:
+            raise KeyError(f'No counts were collected for {col!r}')
+        return self.counts[col].sort_index()
+
+    def group_value_counts(self, key):
+        """Counts per value of ``BOX_COLUMN``, for each value of ``key`` in sorted order."""
+        if key not in self.group_counts:
+            raise KeyError(f'No counts were collected for {key!r}')
+        counts = self.group_counts[key].sort_index()
+        return {group: part.droplevel(0) for group, part in counts.groupby(level=0, sort=True)}
+
+
+def count_chunks(chunks, columns=NUMERICAL_COLUMNS, by=CATEGORICAL_COLUMNS, bin_widths=None):
+    """Build a :class:`ValueCounter` in one pass over ``chunks``."""
+    counter = ValueCounter(columns, by, bin_widths)
+    for chunk in chunks:
+        with stage('value_counts'):
+            counter.update(chunk)
+            count_rows(len(chunk))
+    return counter
+
+
+def _arrays(counts):
+    counts = counts[counts > 0].sort_index()
+    return counts.index.to_numpy(dtype='float64'), counts.to_numpy(dtype='float64')
+
+
+def quantiles(counts, q):
+    """Quantiles ``q`` (in [0, 1]) of the rows counted in ``counts``.
+
+    Interpolates linearly between rows, like ``np.percentile`` on the raw values.
+    """
+    values, weights = _arrays(counts)
+    cumulative = np.cumsum(weights)
+    positions = np.asarray(q, dtype='float64') * (cumulative[-1] - 1)
+    lower = np.floor(positions)
+    below = values[np.searchsorted(cumulative, lower, side='right')]
+    above = values[np.searchsorted(cumulative, np.minimum(lower + 1, cumulative[-1] - 1), side='right')]
+    return below + (above - below) * (positions - lower)
+
+
+def bin_edges(counts, bin_width=None):
+    """Histogram bin edges for the rows counted in ``counts``.
+
+    Without ``bin_width``, the edges are the ones ``np.histogram_bin_edges(raw, 'auto')``
+    returns. With it, the counts are taken to be per bin center and the
+    edges are those of the bins.
+    """
+    values, weights = _arrays(counts)
+    if bin_width is not None:
+        return np.arange(values[0] - bin_width / 2, values[-1] + bin_width, bin_width)
+    first, last = values[0], values[-1]
+    if first == last:
+        first, last = first - 0.5, last + 0.5
+    n = weights.sum()
+    spread = values[-1] - values[0]
+    q1, q3 = quantiles(counts, [0.25, 0.75])
+    # The smaller of the Sturges width and the Freedman-Diaconis width, the
+    # latter kept above half the square-root-rule width
+    fd_width = max(2.0 * (q3 - q1) * n ** (-1.0 / 3.0), spread / np.sqrt(n) / 2)
+    width = min(fd_width, spread / (np.log2(n) + 1.0))
+    bins = int(np.ceil((last - first) / width)) if width else 1
+    return np.linspace(first, last, bins + 1)
+
+
+def kde_bandwidth(counts):
+    """The ``bw_method`` factor that makes a KDE of the counted values match Scott's rule on the raw rows.
+
+    ``scipy.stats.gaussian_kde`` scales the weighted variance of the values
+    by the factor; on the raw rows the kernel variance is their sample
+    variance times ``n ** (-2 / 5)``. Returns None when the values do not vary.
+    """
+    values, weights = _arrays(counts)
+    n = weights.sum()
+    mean = np.average(values, weights=weights)
+    squares = (weights * (values - mean) ** 2).sum()
+    if not squares:
+        return None
+    weighted_variance = squares / (n - (weights ** 2).sum() / n)
+    raw_variance = squares / (n - 1)
+    return float(np.sqrt(raw_variance / weighted_variance) * n ** (-1.0 / 5.0))
+
+
+def histogram(counts, bin_width=None):
+    """Keyword arguments of ``sns.histplot(..., kde=True)`` drawing the histogram of ``counts``.
+
+    The KDE is left out when the values do not vary, as seaborn does.
+    """
+    values, weights = _arrays(counts)
+    # A list, as seaborn compares ``bins`` with 'auto'
+    kws = {'x': values, 'weights': weights, 'bins': bin_edges(counts, bin_width).tolist()}
+    bandwidth = kde_bandwidth(counts)
+    kws['kde'] = bandwidth is not None
+    if bandwidth is not None:
+        kws['kde_kws'] = {'bw_method': bandwidth}
+    return kws
+
+
+def box_stats(counts, whis=1.5, label=None):
+    """Box statistics of the rows counted in ``counts``, as ``matplotlib.cbook.boxplot_stats`` returns them.
+
+    The outliers are listed once per distinct value.
+    """
+    values, weights = _arrays(counts)
+    n = weights.sum()
+    q1, med, q3 = quantiles(counts, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    low, high = q1 - whis * iqr, q3 + whis * iqr
+    inside_high = values[values <= high]
+    inside_low = values[values >= low]
+    whishi = inside_high.max() if len(inside_high) and inside_high.max() >= q3 else q3
+    whislo = inside_low.min() if len(inside_low) and inside_low.min() <= q1 else q1
+    stats = {
+        'mean': np.average(values, weights=weights),
+        'iqr': iqr,
+        'cilo': med - 1.57 * iqr / np.sqrt(n),
+        'cihi': med + 1.57 * iqr / np.sqrt(n),
+        'whishi': whishi,
+        'whislo': whislo,
+        'fliers': values[(values < whislo) | (values > whishi)],
+        'q1': q1,
+        'med': med,
+        'q3': q3,
+    }
+    if label is not None:
+        stats['label'] = label
+    return stats
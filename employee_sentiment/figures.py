@@ -0,0 +1,216 @@
+"""The figures of the analysis, drawn from precomputed data.
+
+Every figure is a function that takes the (small) tables it shows and
+returns a new matplotlib Figure, so the same code serves the command line
+(:mod:`employee_sentiment.cli`), which shows the figures, and
+:mod:`employee_sentiment.report`, which renders them headless to files in
+worker processes.
+
+Seaborn and wordcloud are slow to import, so they are only imported by the
+figures that use them.
+"""
+
+import colorsys # For the line colour of the boxplots
+
+import matplotlib.pyplot as plt # For data visualization
+
+from .distributions import BOX_COLUMN, box_stats, histogram
+from .instrumentation import stage
+
+
+def numerical_distributions(columns, binned=False):
+    """Histograms with a KDE of each numerical column, five per figure column.
+
+    ``columns`` maps each column name to its values or, with ``binned``, to
+    the counts of its values (see :mod:`distributions`).
+    """
+    import seaborn as sns
+    fig, axes = plt.subplots(5, 2, figsize=(15, 20))
+    for i, (col, values) in enumerate(columns.items()):
+        ax = axes[i % 5, i // 5]
+        if binned:
+            sns.histplot(**histogram(values), ax=ax)
+        else:
+            sns.histplot(values, kde=True, ax=ax)
+        ax.set_title(f'Distribution of {col}')
+        ax.set_xlabel(col)
+        ax.set_ylabel('Frequency')
+    fig.tight_layout()
+    return fig
+
+
+def categorical_counts(counts):
+    """Bar charts of the number of rows per category.
+
+    ``counts`` maps each categorical column to a Series of counts per value.
+    """
+    import seaborn as sns
+    fig, axes = plt.subplots(1, len(counts), figsize=(15, 5))
+    for ax, (col, values) in zip(axes, counts.items()):
+        sns.barplot(x=values.index.astype(str), y=values.to_numpy(), ax=ax)
+        ax.set_title(f'Count Plot of {col}')
+        ax.set_xlabel(col)
+        ax.set_ylabel('Count')
+    fig.tight_layout()
+    return fig
+
+
+def rating_correlation(correlation):
+    """Heatmap of the correlation matrix of the ratings."""
+    import seaborn as sns
+    fig, ax = plt.subplots(figsize=(12, 8))
+    sns.heatmap(correlation, annot=True, cmap='coolwarm', fmt=".2f", ax=ax)
+    ax.set_title('Correlation Matrix of Employee Ratings')
+    return fig
+
+
+def tenure_means(means):
+    """Heatmap of the average ratings per employee tenure."""
+    import seaborn as sns
+    fig, ax = plt.subplots(figsize=(20, 6))
+    sns.heatmap(means, cmap='coolwarm', annot=True, linewidths=0.5, ax=ax)
+    ax.set_title('Average Ratings by Employee Tenure')
+    return fig
+
+
+def engagement_location_crosstab(cross_tab):
+    """Frequency plot of engagement participation by location."""
+    fig, ax = plt.subplots(figsize=(8, 6))
+    image = ax.imshow(cross_tab, cmap='Blues')
+    ax.set_title('Frequency Plot')
+    ax.set_xlabel('Location')
+    ax.set_ylabel('Employee Engagement Activities')
+    ax.set_xticks(range(len(cross_tab.columns)), cross_tab.columns)
+    ax.set_yticks(range(len(cross_tab.index)), cross_tab.index)
+
+    # Add the values inside the grids
+    for i in range(len(cross_tab.index)):
+        for j in range(len(cross_tab.columns)):
+            ax.text(j, i, str(cross_tab.iloc[i, j]), ha='center', va='center')
+
+    fig.colorbar(image, ax=ax)
+    return fig
+
+
+def category_means(engagement_means, location_means):
+    """Heatmaps of the average ratings per engagement participation and per location."""
+    import seaborn as sns
+    fig, axes = plt.subplots(2, 1, figsize=(15, 12))
+    sns.heatmap(engagement_means, cmap='coolwarm', ax=axes[0], annot=True)
+    axes[0].set_title('Average Ratings by Participation in Engagement Activities')
+    sns.heatmap(location_means, cmap='coolwarm', ax=axes[1], annot=True)
+    axes[1].set_title('Average Ratings by Location')
+    fig.tight_layout()
+    return fig
+
+
+def _boxplot_from_counts(key, counts, ax):
+    """Boxplot of ``Employee_Tenure`` per value of ``key``, from the counts of each group.
+
+    The exact box statistics of every group are drawn with ``Axes.bxp``,
+    styled like seaborn's default boxplot: boxes of the first palette
+    colour, desaturated, with lines of a darker grey of its lightness.
+    """
+    import seaborn as sns
+    groups = list(counts)
+    stats = [box_stats(counts[group]) for group in groups]
+    color = sns.desaturate(sns.color_palette()[0], 0.75)
+    lightness = colorsys.rgb_to_hls(*color)[1] * 0.6
+    line_color = (lightness,) * 3
+    ax.bxp(stats, positions=range(len(groups)), widths=0.8, patch_artist=True, manage_ticks=False,
+           boxprops={'facecolor': color, 'edgecolor': line_color},
+           medianprops={'color': line_color, 'solid_capstyle': 'butt'},
+           whiskerprops={'color': line_color, 'solid_capstyle': 'butt'},
+           capprops={'color': line_color}, flierprops={'markeredgecolor': line_color})
+    ax.set_xticks(range(len(groups)), [str(group) for group in groups])
+    ax.set_xlim(-0.5, len(groups) - 0.5)
+    ax.set_xlabel(key)
+    ax.set_ylabel(BOX_COLUMN)
+
+
+def tenure_boxplots(frame, binned=False):
+    """Boxplots of the employee tenure per engagement participation and per location.
+
+    ``frame`` holds the ``Employee_Tenure`` column with the two categorical
+    columns or, with ``binned``, maps each categorical column to the tenure
+    counts of each of its values (see :meth:`distributions.ValueCounter.group_value_counts`).
+    """
+    import seaborn as sns
+    fig, ax = plt.subplots(1, 2, figsize=(20, 8))
+    for axis, key in zip(ax, ['Employee_Engagement_Activities', 'Location']):
+        if binned:
+            _boxplot_from_counts(key, frame[key], axis)
+        else:
+            sns.boxplot(x=key, y=BOX_COLUMN, data=frame, ax=axis)
+    ax[0].set_title('Employee Tenure by Engagement Activity Participation')
+    ax[1].set_title('Employee Tenure by Location')
+    return fig
+
+
+WORD_CLOUD_TITLES = {
+    'Comment_Positives': 'Common Words in Positive Comments',
+    'Comment_Negatives': 'Common Words in Negative Comments',
+    'Advice_To_Mgmt': 'Common Words in Advice To Mgmt',
+}
+
+
+def word_clouds(frequencies):
+    """Word clouds of the comment columns.
+
+    ``frequencies`` maps each comment column to a dict of word frequencies.
+    """
+    from wordcloud import WordCloud
+    wordcloud = WordCloud(background_color="white", width=900, height=450)
+    fig, ax = plt.subplots(2, 2, figsize=(18, 10))
+    for axis, (col, words) in zip(ax.ravel(), frequencies.items()):
+        with stage('word_cloud'):
+            wordcloud.generate_from_frequencies(words)
+        axis.imshow(wordcloud)
+        axis.set_title(WORD_CLOUD_TITLES.get(col, f'Common Words in {col}'))
+        axis.axis("off")
+
+    # Remove unused axes
+    for axis in ax.ravel()[len(frequencies):]:
+        axis.remove()
+    return fig
+
+
+def weekly_trends(weekly, granularity='W'):
+    """One line plot of the weekly (or per period of ``granularity``) average per rating column."""
+    from .trend_cube import GRANULARITIES
+
+    _, _, adjective, noun = GRANULARITIES[granularity]
+    fig, ax = plt.subplots(len(weekly.columns), 1, figsize=(15, 25))
+    for axis, column in zip(ax, weekly.columns):
+        axis.plot(weekly.index, weekly[column])
+        axis.set_title(f'Average {column} ({adjective})')
+        axis.set_xlabel(noun)
+        axis.set_ylabel('Average Rating')
+    fig.tight_layout()
+    return fig
+
+
+def sentiment_labels(label_counts):
+    """Bar chart of the number of comments per sentiment label and comment column."""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    label_counts.T.plot(kind='bar', color=['tab:red', 'tab:gray', 'tab:green'], ax=ax)
+    ax.set_title('Sentiment of the Comments')
+    ax.set_xlabel('Comment Column')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=0)
+    return fig
+
+
+# Every figure, by the name its file is saved under
+FIGURES = {
+    'numerical_distributions': numerical_distributions,
+    'categorical_counts': categorical_counts,
+    'rating_correlation': rating_correlation,
+    'tenure_means': tenure_means,
+    'engagement_location_crosstab': engagement_location_crosstab,
+    'category_means': category_means,
+    'tenure_boxplots': tenure_boxplots,
+    'word_clouds': word_clouds,
+    'weekly_trends': weekly_trends,
+    'sentiment_labels': sentiment_labels,
+}
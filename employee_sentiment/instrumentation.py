@@ -0,0 +1,284 @@
+"""Per-stage instrumentation of the analysis pipeline.
+
+The loaders, aggregations, text stages and figures mark their work with
+:func:`stage`, e.g. ``with stage('read_csv'): ...``, and report the rows
+they handle with :func:`count_rows`. Outside of :func:`profiling` both are
+no-ops. Within it, a :class:`Profiler` records for every stage:
+
+- the number of calls and the rows processed,
+- wall and CPU time (the CPU time of this process plus that of any worker
+  processes reaped during the stage), in total and excluding nested stages,
+- the peak resident set size reached during the stage, on Linux by
+  resetting the kernel's high-water mark on entry, elsewhere the peak of
+  the process so far.
+
+Stages can be entered many times (once per chunk, say) and their
+statistics add up. At the end of a run the statistics are written as JSON
+or in the Prometheus text format. Optionally, each outermost stage is also
+run under cProfile and/or tracemalloc, and a ``.prof`` file and a
+tracemalloc snapshot per stage are written to ``dump_dir``.
+"""
+
+import cProfile # For the optional per-stage profiles
+import json # For the JSON output
+import os # For the dump directory
+import resource # For CPU time of worker processes and the peak RSS fallback
+import sys # For the unit of ru_maxrss
+import time # For wall and CPU time
+import tracemalloc # For the optional per-stage allocation snapshots
+from contextlib import contextmanager, nullcontext # For the stage context managers
+
+METRIC_PREFIX = 'employee_sentiment_stage'
+
+# (name, type, help, field) of each Prometheus metric
+METRICS = [
+    ('calls_total', 'counter', 'Number of times the stage was entered.', 'calls'),
+    ('rows_total', 'counter', 'Rows processed by the stage.', 'rows'),
+    ('wall_seconds', 'counter', 'Wall time spent in the stage, nested stages included.', 'wall'),
+    ('self_wall_seconds', 'counter', 'Wall time spent in the stage, nested stages excluded.', 'self_wall'),
+    ('cpu_seconds', 'counter', 'CPU time spent in the stage, nested stages included.', 'cpu'),
+    ('self_cpu_seconds', 'counter', 'CPU time spent in the stage, nested stages excluded.', 'self_cpu'),
+    ('peak_rss_bytes', 'gauge', 'Peak resident set size reached during the stage.', 'peak_rss'),
+    ('traced_peak_bytes', 'gauge', 'Peak memory traced by tracemalloc during the stage.', 'traced_peak'),
+]
+
+_CLEAR_REFS = '/proc/self/clear_refs'
+_STATUS = '/proc/self/status'
+
+_NULL_STAGE = nullcontext()
+
+_active = None
+
+
+def _cpu_time():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _reset_peak_rss():
+    """Reset the kernel's RSS high-water mark, returning whether that is supported."""
+    try:
+        with open(_CLEAR_REFS, 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """Peak resident set size in bytes, since the last reset where supported."""
+    try:
+        with open(_STATUS) as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageStats:
+    """Running statistics of one stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.rows = 0
+        self.wall = 0.0
+        self.self_wall = 0.0
+        self.cpu = 0.0
+        self.self_cpu = 0.0
+        self.peak_rss = 0
+        self.traced_peak = None
+
+    def to_dict(self):
+        return {field: getattr(self, field) for _, _, _, field in METRICS
+                if getattr(self, field) is not None}
+
+
+class _Frame:
+    """A stage being run, on the profiler's stack."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.rows = 0
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.peak_rss = 0
+        self.traced_peak = 0
+        self.profile = None
+
+
+class Profiler:
+    """Statistics of every stage run while it is active (see :func:`profiling`).
+
+    With ``dump_dir``, the outermost stages are run under cProfile
+    (``cprofile=True``) and/or tracemalloc (``trace_memory=True``), and
+    their profiles and snapshots are written there by :meth:`dump`.
+    """
+
+    def __init__(self, dump_dir=None, cprofile=False, trace_memory=False):
+        if (cprofile or trace_memory) and dump_dir is None:
+            raise ValueError('cprofile and trace_memory need a dump_dir')
+        self.dump_dir = dump_dir
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.profiles = {}
+        self.snapshots = {}
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(name)
+        frame = _Frame(stats)
+        outermost = not self._stack
+        if not outermost:
+            # Keep the enclosing stage's peaks before resetting the marks
+            parent = self._stack[-1]
+            parent.peak_rss = max(parent.peak_rss, _peak_rss())
+            if self.trace_memory:
+                parent.traced_peak = max(parent.traced_peak, tracemalloc.get_traced_memory()[1])
+        self._stack.append(frame)
+
+        resettable = _reset_peak_rss()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        if self.cprofile and outermost:
+            frame.profile = self.profiles.setdefault(name, cProfile.Profile())
+            frame.profile.enable()
+        wall, cpu = time.perf_counter(), _cpu_time()
+        try:
+            yield frame
+        finally:
+            wall, cpu = time.perf_counter() - wall, _cpu_time() - cpu
+            if frame.profile is not None:
+                frame.profile.disable()
+            self._stack.pop()
+            parent = self._stack[-1] if self._stack else None
+
+            # The high-water marks were reset on entry, and again by every
+            # nested stage, so the stage's peak is the largest of the marks
+            # seen since
+            frame.peak_rss = max(frame.peak_rss, _peak_rss())
+            stats.calls += 1
+            stats.rows += frame.rows
+            stats.wall += wall
+            stats.self_wall += wall - frame.child_wall
+            stats.cpu += cpu
+            stats.self_cpu += cpu - frame.child_cpu
+            stats.peak_rss = max(stats.peak_rss, frame.peak_rss if resettable else _peak_rss())
+            if self.trace_memory:
+                frame.traced_peak = max(frame.traced_peak, tracemalloc.get_traced_memory()[1])
+                stats.traced_peak = max(stats.traced_peak or 0, frame.traced_peak)
+                if outermost:
+                    self.snapshots[name] = tracemalloc.take_snapshot()
+            if parent is not None:
+                parent.child_wall += wall
+                parent.child_cpu += cpu
+                parent.peak_rss = max(parent.peak_rss, frame.peak_rss)
+                parent.traced_peak = max(parent.traced_peak, frame.traced_peak)
+
+    def count_rows(self, rows):
+        if self._stack:
+            self._stack[-1].rows += rows
+
+    def to_dict(self):
+        """The statistics of every stage, keyed by stage name, in the order stages were first entered."""
+        return {name: stats.to_dict() for name, stats in self.stages.items()}
+
+    def to_json(self):
+        return json.dumps({'stages': self.to_dict()}, indent=2)
+
+    def to_prometheus(self):
+        """The statistics in the Prometheus text exposition format."""
+        lines = []
+        for suffix, kind, description, field in METRICS:
+            samples = [(name, getattr(stats, field)) for name, stats in self.stages.items()
+                       if getattr(stats, field) is not None]
+            if not samples:
+                continue
+            metric = f'{METRIC_PREFIX}_{suffix}'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.extend(f'{metric}{{stage="{name}"}} {value}' for name, value in samples)
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the statistics to ``path``: Prometheus text for ``.prom``/``.txt`` files, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def dump(self):
+        """Write the cProfile profiles and tracemalloc snapshots of the outermost stages, returning their paths."""
+        paths = []
+        if self.dump_dir is None:
+            return paths
+        os.makedirs(self.dump_dir, exist_ok=True)
+        for name, profile in self.profiles.items():
+            paths.append(os.path.join(self.dump_dir, f'{name}.prof'))
+            profile.dump_stats(paths[-1])
+        for name, snapshot in self.snapshots.items():
+            paths.append(os.path.join(self.dump_dir, f'{name}.tracemalloc'))
+            snapshot.dump(paths[-1])
+        return paths
+
+
+@contextmanager
+def profiling(profiler):
+    """Record the stages run within the block in ``profiler``."""
+    global _active
+    previous, _active = _active, profiler
+    started = profiler.trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield profiler
+    finally:
+        if started:
+            tracemalloc.stop()
+        _active = previous
+
+
+def stage(name):
+    """Context manager marking a stage of the pipeline; a no-op outside of :func:`profiling`."""
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+
+def count_rows(rows):
+    """Add ``rows`` to the rows processed by the innermost running stage."""
+    if _active is not None:
+        _active.count_rows(rows)
+
+
+def add_arguments(parser):
+    """Add the instrumentation options to a command line ``parser``."""
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument('--metrics', metavar='PATH',
+                       help='write per-stage statistics to PATH at the end of the run '
+                            '(Prometheus text for .prom/.txt files, JSON otherwise)')
+    group.add_argument('--profile', nargs='+', default=[], choices=['cprofile', 'tracemalloc'],
+                       help='also profile the outermost stages, with a dump per stage in --profile-dir')
+    group.add_argument('--profile-dir', help='directory of the --profile dumps')
+
+
+@contextmanager
+def instrumented(args):
+    """Profile the block as the options of :func:`add_arguments` ask, writing the results at its end."""
+    if args.metrics is None and not args.profile:
+        yield None
+        return
+    profiler = Profiler(args.profile_dir, cprofile='cprofile' in args.profile,
+                        trace_memory='tracemalloc' in args.profile)
+    with profiling(profiler):
+        yield profiler
+    if args.metrics is not None:
+        profiler.write(args.metrics)
+    for path in profiler.dump():
+        print(path, file=sys.stderr)
@@ -0,0 +1,168 @@
+"""Fast previews of the sections on a stratified sample of the dataset.
+
+Exact numbers over tens of millions of rows are not needed to see what the
+heatmaps and trends look like. A :class:`Preview` draws a stratified
+reservoir sample of the rows (see :mod:`sampling`) and runs the sections on
+it in memory, so their tables and figures keep their usual shape; the
+counts in them are those of the sample. The sections of 2, 4.2 and 4.4
+also report confidence intervals, estimated from the sample:
+
+- ``overview``: ``means_ci``, the mean of every numerical column,
+- ``bivariate``: ``rating_correlation_ci``, every pair of ratings, and
+  ``tenure_means_ci``, ``engagement_means_ci`` and ``location_means_ci``,
+- ``temporal``: ``trends_ci``, the mean ratings of every period.
+
+The sample is drawn in two passes over the dataset (or its shards, on a
+backend): one counting the rows of every stratum, one keeping the sampled
+rows. Its size is a row budget, or follows a time budget: the sections are
+timed on two small pilot samples first, and the sample sized for them to
+fit in what is left of the given time once the sample is drawn and the
+pilots run.
+"""
+
+from functools import partial # For the sampling task
+import time # For the time budget
+import warnings # For a time budget used up before the sections run
+
+import pandas as pd # For data manipulation
+
+from .data_loader import CATEGORICAL_COLUMNS, COLUMNS, DATE_COLUMN, NUMERICAL_COLUMNS, RATING_COLUMNS
+from .dataset_index import NoRowsError
+from .instrumentation import stage
+from .sampling import STRATUM_COLUMNS, allocate, correlation_ci, count_strata, group_means_ci, sample_chunks
+from .trend_cube import period_ends
+
+from .sections import _reduce, run
+
+DEFAULT_ROWS = 100_000
+
+# Rows of the sample the sections are timed on, for a time budget
+PILOT_ROWS = 2_000
+
+
+def _pairs(correlations):
+    """The upper triangle of ``estimate``, ``low`` and ``high`` correlation matrices, one row per pair."""
+    columns = list(correlations['estimate'].columns)
+    pairs = [(first, second) for i, first in enumerate(columns) for second in columns[i + 1:]]
+    return pd.DataFrame({stat: [correlations[stat].loc[first, second] for first, second in pairs]
+                         for stat in ['estimate', 'low', 'high']},
+                        index=pd.MultiIndex.from_tuples(pairs))
+
+
+class Preview:
+    """A stratified sample of a dataset, kept in memory to run the sections on.
+
+    ``reservoir`` is a :class:`~sampling.StratifiedReservoir` of the
+    dataset, ``populations`` its rows per stratum; with ``allocation``, the
+    smaller sample it allots is used. ``frame`` holds the sampled rows typed
+    as the dataset cache delivers them, and ``seconds`` the time taken to
+    draw the sample.
+    """
+
+    def __init__(self, reservoir, populations, allocation=None, seconds=0.0):
+        self.reservoir = reservoir
+        self.populations = populations
+        self.sample = reservoir.sample(allocation)
+        self.frame = self.sample[COLUMNS].astype({col: 'category' for col in CATEGORICAL_COLUMNS})
+        self.seconds = seconds
+
+    @classmethod
+    def draw(cls, path, rows=DEFAULT_ROWS, seed=0, backend=None, where=None):
+        """Draw a sample of about ``rows`` rows of ``path``, or of the shards at ``path`` with ``backend``.
+
+        Only the rows ``where`` keeps are sampled, when given; a
+        :class:`~dataset_index.NoRowsError` is raised when there are none.
+        """
+        start = time.perf_counter()
+        populations = _reduce(count_strata, path, STRATUM_COLUMNS, backend, where).counts
+        if populations is None:
+            raise NoRowsError('No rows to sample' if where is None else f'No rows match {where!r}')
+        task = partial(sample_chunks, allocation=allocate(populations, rows), seed=seed)
+        reservoir = _reduce(task, path, None, backend, where)
+        return cls(reservoir, populations, seconds=time.perf_counter() - start)
+
+    def subsample(self, rows):
+        """A preview of about ``rows`` of the sampled rows: the sample a budget of ``rows`` would have drawn."""
+        return Preview(self.reservoir, self.populations, allocate(self.populations, rows), self.seconds)
+
+    def summary(self):
+        rows, population = len(self.sample), int(self.populations.sum())
+        return pd.Series({'rows': rows, 'population': population, 'strata': len(self.populations),
+                          'fraction': rows / population}, dtype=object)
+
+    def run(self, name, **options):
+        """Run section ``name`` on the sample, adding its confidence intervals to its tables.
+
+        ``options`` are those of :func:`~employee_sentiment.sections.run`;
+        the rows were filtered when the sample was drawn.
+        """
+        result = run(name, self.frame, **options)
+        result['tables'].update(self.confidence_intervals(name, options.get('granularity', 'W')))
+        return result
+
+    def confidence_intervals(self, name, granularity='W'):
+        """The tables of estimates and confidence intervals of section ``name``, by table name."""
+        sample, populations = self.sample, self.populations
+        with stage('confidence_intervals'):
+            if name == 'overview':
+                means = group_means_ci(sample, populations, NUMERICAL_COLUMNS)
+                return {'means_ci': means.loc['All'].unstack(level=0)}
+            if name == 'bivariate':
+                return {
+                    'rating_correlation_ci': _pairs(correlation_ci(sample, populations, RATING_COLUMNS)),
+                    'tenure_means_ci': group_means_ci(sample, populations, RATING_COLUMNS, 'Employee_Tenure'),
+                    'engagement_means_ci': group_means_ci(sample, populations, RATING_COLUMNS,
+                                                          'Employee_Engagement_Activities'),
+                    'location_means_ci': group_means_ci(sample, populations, RATING_COLUMNS, 'Location'),
+                }
+            if name == 'temporal':
+                periods = period_ends(sample[DATE_COLUMN].dt.normalize(), granularity).rename(DATE_COLUMN)
+                return {'trends_ci': group_means_ci(sample, populations, RATING_COLUMNS, periods)}
+        return {}
+
+
+def _time_sections(preview, names, options):
+    start = time.perf_counter()
+    for name in names:
+        preview.run(name, **options)
+    return time.perf_counter() - start
+
+
+def budget_rows(preview, names, seconds, **options):
+    """Sample rows for the preview of the sections ``names`` to take about ``seconds``, at most those of ``preview``.
+
+    The sections are timed on two pilot subsamples of ``preview``, of
+    :data:`PILOT_ROWS` and four times as many rows, and their time taken
+    to be a fixed cost plus a cost per row. The time taken to draw
+    ``preview`` and to run the pilots is taken off ``seconds`` first; when
+    what is left would not even run the smaller pilot again, a warning is
+    issued and the rows of that pilot returned.
+    """
+    start = time.perf_counter()
+    timings = []
+    for rows in [PILOT_ROWS, 4 * PILOT_ROWS]:
+        pilot = preview.subsample(rows)
+        timings.append((len(pilot.sample), _time_sections(pilot, names, options)))
+    (small, small_time), (large, large_time) = timings
+    left = seconds - preview.seconds - (time.perf_counter() - start)
+    if left < small_time:
+        warnings.warn(f'The time budget of {seconds:g} s was used up drawing the sample and timing the sections '
+                      f'({seconds - left:.1f} s); previewing on {small:,} rows', stacklevel=2)
+        return small
+    per_row = (large_time - small_time) / (large - small) if large > small else 0.0
+    if per_row <= 0:
+        return len(preview.sample)
+    fixed = max(small_time - per_row * small, 0.0)
+    return int(min(max((left - fixed) / per_row, small), len(preview.sample)))
+
+
+def add_arguments(parser):
+    """Add the preview options to a command line ``parser``."""
+    group = parser.add_argument_group('preview')
+    group.add_argument('--preview', type=int, nargs='?', const=DEFAULT_ROWS, metavar='ROWS',
+                       help=f'run the sections on a stratified sample of about ROWS rows (default: {DEFAULT_ROWS:,}), '
+                            'with confidence intervals')
+    group.add_argument('--time-budget', type=float, metavar='SECONDS',
+                       help='preview on a sample sized for the whole preview, drawing the sample included, '
+                            'to take about SECONDS (at most --preview rows)')
+    group.add_argument('--seed', type=int, default=0, help='seed of the preview sample')
@@ -0,0 +1,107 @@
+"""Headless report: every figure of the analysis rendered to files.
+
+For batch runs the figures are not shown but saved as PNG and/or SVG files,
+on the non-interactive Agg backend. The data behind all figures is computed
+first, in the parent process; the figures are then drawn in a process pool,
+each worker receiving only the tables of its own figure.
+
+Usage::
+
+    python -m employee_sentiment.report Dataset.csv --output-dir report --format png svg --workers 4 --metrics stages.prom
+"""
+
+import argparse # For the command line interface
+import contextlib # For opening the comment cache only when asked
+import os # For the output directory
+from concurrent.futures import ProcessPoolExecutor # For rendering figures in parallel
+
+import matplotlib # For selecting the headless backend
+
+from . import dataset_index
+from .instrumentation import add_arguments, instrumented, stage
+from .sections import SECTIONS, open_comment_cache, run
+
+
+def collect_figure_data(path, cache=None, binned=True, where=None):
+    """Compute the data of every figure, keyed by figure name.
+
+    Each value is the tuple of arguments of the figure function in
+    :data:`figures.FIGURES`. With ``binned``, the histograms and boxplots
+    are drawn from value counts instead of every row. With ``where``, the
+    figures only cover the rows that :class:`~dataset_index.RowFilter` keeps.
+    """
+    figure_data = {}
+    # The overview section only has tables
+    for name in [name for name in SECTIONS if name != 'overview']:
+        figure_data.update(run(name, path, cache=cache, binned=binned, where=where)['figures'])
+    return figure_data
+
+
+def _use_agg():
+    matplotlib.use('Agg')
+
+
+def render_figure(name, args, output_dir, formats):
+    """Draw one figure and save it in each of ``formats``, returning the file paths."""
+    _use_agg()
+    import matplotlib.pyplot as plt
+    from .figures import FIGURES
+
+    with stage(f'render.{name}'):
+        fig = FIGURES[name](*args)
+        paths = []
+        for fmt in formats:
+            path = os.path.join(output_dir, f'{name}.{fmt}')
+            fig.savefig(path, format=fmt, bbox_inches='tight')
+            paths.append(path)
+        plt.close(fig)
+    return paths
+
+
+def render_report(figure_data, output_dir, formats=('png',), workers=None):
+    """Render every figure of ``figure_data`` to ``output_dir``.
+
+    Figures are drawn in ``workers`` processes (one per core by default), or
+    in this process with ``workers=1``. Returns the paths of the files
+    written, in the order of ``figure_data``.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if workers == 1:
+        return [path for name, args in figure_data.items()
+                for path in render_figure(name, args, output_dir, formats)]
+    # Figures rendered in the pool are only timed as a whole
+    with stage('render'), ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as pool:
+        futures = [pool.submit(render_figure, name, args, output_dir, formats)
+                   for name, args in figure_data.items()]
+        return [path for future in futures for path in future.result()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('dataset', help='path of the feedback CSV')
+    parser.add_argument('--output-dir', default='report')
+    parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg'], dest='formats')
+    parser.add_argument('--workers', type=int, default=None, help='rendering processes (default: one per core)')
+    parser.add_argument('--raw-distributions', action='store_false', dest='binned',
+                        help='draw the histograms and boxplots from every row instead of value counts')
+    parser.add_argument('--comment-cache', action='store_true',
+                        help='keep the per-comment results of the text sections across runs')
+    add_arguments(parser)
+    dataset_index.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.profile and args.profile_dir is None:
+        parser.error('--profile needs --profile-dir')
+    where = dataset_index.filter_from_args(args, parser)
+
+    _use_agg()
+    with instrumented(args):
+        comment_cache = open_comment_cache(args.dataset) if args.comment_cache else contextlib.nullcontext()
+        with comment_cache as cache:
+            figure_data = collect_figure_data(args.dataset, cache=cache, binned=args.binned,
+                                              where=where)
+        for path in render_report(figure_data, args.output_dir, args.formats, args.workers):
+            print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""Stratified reservoir samples of the dataset, and estimates with confidence intervals.
+
+Previews of the analysis (see :mod:`employee_sentiment.preview`) run on a
+sample of the rows, stratified by ``Location``,
+``Employee_Engagement_Activities`` and month of ``Feedback_Date``, so that
+every combination keeps its share of the sample whatever its size:
+
+- the rows of every stratum are counted in a first pass
+  (:class:`StratumCounts`), and the sample rows allotted to the strata in
+  proportion to their sizes (:func:`allocate`), at least two per stratum,
+- a second pass keeps, in each stratum, the rows with the smallest sampling
+  keys (:class:`StratifiedReservoir`). A row's key is a hash of its ``ID``,
+  uniform and independent of the other rows, so each stratum's reservoir
+  is a uniform sample of its rows that does not depend on the chunks, the
+  shards or the order they are read in. Reservoirs over separate shards
+  merge into the reservoir of the whole dataset, and the reservoirs of a
+  smaller budget are subsets of those of a larger one.
+
+Means per group (tenure, category, period) are estimated from the sample
+with stratum weights, and their variance by linearization over the strata
+(:func:`group_means_ci`). Correlations get a Fisher z interval, its
+standard error estimated by jackknife (:func:`correlation_ci`).
+"""
+
+from statistics import NormalDist # For the quantiles of the confidence intervals
+
+import numpy as np # For the estimators
+import pandas as pd # For data manipulation
+
+from .data_loader import DATE_COLUMN
+from .instrumentation import count_rows, stage
+from .trend_cube import period_ends
+
+DATE_BUCKET = 'Date_Bucket'
+
+# Columns of the strata, the date bucketed at BUCKET_GRANULARITY
+STRATUM_COLUMNS = ['Location', 'Employee_Engagement_Activities', DATE_COLUMN]
+STRATA = ['Location', 'Employee_Engagement_Activities', DATE_BUCKET]
+BUCKET_GRANULARITY = 'M'
+
+# Every column the reservoir reads besides those it keeps
+SAMPLE_KEY_COLUMNS = ['ID'] + STRATUM_COLUMNS
+
+# Fewest rows sampled from a stratum, for the variance within it
+MIN_STRATUM_ROWS = 2
+
+# Groups of the jackknife estimating the variance of the correlations
+JACKKNIFE_GROUPS = 50
+
+_KEY = '_sample_key'
+_STRATUM = '_stratum'
+
+
+def stratify(chunk, granularity=BUCKET_GRANULARITY):
+    """The stratum of every row of ``chunk``.
+
+    Returns ``(codes, strata)``: for each row, the position of its stratum
+    in ``strata``, a frame of the :data:`STRATA` columns with a row per
+    distinct stratum of the chunk.
+    """
+    location_codes, locations = pd.factorize(chunk['Location'])
+    engagement_codes, engagements = pd.factorize(chunk['Employee_Engagement_Activities'])
+    # Bucket the distinct days once, then every row through its day's code
+    day_codes, days = pd.factorize(chunk[DATE_COLUMN].dt.normalize())
+    day_buckets, buckets = pd.factorize(period_ends(days, granularity))
+    combined = (location_codes * len(engagements) + engagement_codes) * len(buckets) + day_buckets[day_codes]
+    codes, uniques = pd.factorize(combined)
+    location, rest = np.divmod(uniques, len(engagements) * len(buckets))
+    engagement, bucket = np.divmod(rest, len(buckets))
+    return codes, pd.DataFrame({
+        'Location': np.asarray(locations, dtype=object)[location].astype(str),
+        'Employee_Engagement_Activities': np.asarray(engagements, dtype=object)[engagement].astype(str),
+        DATE_BUCKET: buckets[bucket],
+    })
+
+
+def sample_keys(ids, seed=0):
+    """The sampling key of each of ``ids``: a 64-bit hash, the same in every chunk and shard."""
+    # Numbers are hashed without a key, so the seed is mixed in before hashing again
+    salt = pd.util.hash_array(np.array([seed], dtype='uint64'))[0]
+    return pd.util.hash_array(pd.util.hash_array(np.asarray(ids), categorize=False) ^ salt, categorize=False)
+
+
+def _accumulate(total, part):
+    if total is None:
+        return part
+    return total.add(part, fill_value=0).astype('int64')
+
+
+class StratumCounts:
+    """Rows per stratum, updated chunk by chunk."""
+
+    def __init__(self, granularity=BUCKET_GRANULARITY):
+        self.granularity = granularity
+        self.counts = None
+
+    def update(self, chunk):
+        codes, strata = stratify(chunk, self.granularity)
+        counts = pd.Series(np.bincount(codes, minlength=len(strata)), index=pd.MultiIndex.from_frame(strata))
+        self.counts = _accumulate(self.counts, counts)
+        return self
+
+    def merge(self, other):
+        if other.counts is not None:
+            self.counts = _accumulate(self.counts, other.counts)
+        return self
+
+
+def count_strata(chunks, granularity=BUCKET_GRANULARITY):
+    """Count the rows of every stratum of ``chunks``, returning a :class:`StratumCounts`."""
+    counts = StratumCounts(granularity)
+    for chunk in chunks:
+        with stage('count_strata'):
+            counts.update(chunk)
+            count_rows(len(chunk))
+    return counts
+
+
+def allocate(populations, rows, minimum=MIN_STRATUM_ROWS):
+    """Share ``rows`` sample rows among strata of ``populations`` rows, in proportion to their sizes.
+
+    Shares are rounded by largest remainder, then raised to ``minimum``
+    (or the whole stratum, if smaller), so the total may exceed ``rows``
+    slightly. With ``rows`` at least the whole population, every row is
+    kept.
+    """
+    total = populations.sum()
+    if rows >= total:
+        return populations.copy()
+    quotas = populations * (rows / total)
+    allocation = np.floor(quotas).astype('int64')
+    extra = int(rows - allocation.sum())
+    if extra > 0:
+        order = np.argsort(-(quotas - allocation).to_numpy(), kind='stable')[:extra]
+        allocation.iloc[order] += 1
+    return allocation.clip(lower=np.minimum(minimum, populations), upper=populations)
+
+
+def _smallest(strata, keys, quotas):
+    """Positions of the rows of smallest key of each stratum, up to its quota, sorted by stratum and key."""
+    order = np.lexsort((keys, strata))
+    strata = strata[order]
+    starts = np.flatnonzero(np.r_[True, strata[1:] != strata[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return order[rank < quotas[strata]]
+
+
+class StratifiedReservoir:
+    """The rows of smallest sampling key of each stratum, up to its ``allocation``, updated chunk by chunk.
+
+    The rows keep the number of their stratum in ``allocation``, and are
+    sorted by stratum and key.
+    """
+
+    def __init__(self, allocation, granularity=BUCKET_GRANULARITY, seed=0):
+        self.allocation = allocation
+        self.granularity = granularity
+        self.seed = seed
+        self.rows = None
+
+    def _trim(self, rows):
+        rows = rows.reset_index(drop=True)
+        return rows.take(_smallest(rows[_STRATUM].to_numpy(), rows[_KEY].to_numpy(), self.allocation.to_numpy()))
+
+    def update(self, chunk):
+        """Add the rows of ``chunk``, which must have the ``ID`` and stratum columns."""
+        codes, strata = stratify(chunk, self.granularity)
+        # Number the strata of the chunk as in the allocation; those without an allocation are not sampled
+        numbers = self.allocation.index.get_indexer(pd.MultiIndex.from_frame(strata))[codes]
+        keys = sample_keys(chunk['ID'], self.seed)
+        quotas = np.r_[self.allocation.to_numpy(), 0]
+        # Keep the candidates of the chunk before combining them with the reservoir
+        kept = _smallest(numbers, keys, quotas)
+        rows = chunk.take(kept).assign(**{_STRATUM: numbers[kept], _KEY: keys[kept]})
+        self.rows = rows.reset_index(drop=True) if self.rows is None else self._trim(pd.concat([self.rows, rows]))
+        return self
+
+    def merge(self, other):
+        """Add the reservoir of the same allocation over other rows."""
+        if other.rows is not None:
+            self.rows = other.rows if self.rows is None else self._trim(pd.concat([self.rows, other.rows]))
+        return self
+
+    def sample(self, allocation=None):
+        """The sampled rows, with their stratum in the :data:`STRATA` columns.
+
+        With ``allocation`` (of the same strata), the rows of the smaller
+        sample it allots, up to those of the reservoir.
+        """
+        rows = self.rows if self.rows is not None else pd.DataFrame({_STRATUM: [], _KEY: []}, dtype='int64')
+        if allocation is not None:
+            quotas = allocation.reindex(self.allocation.index, fill_value=0).to_numpy()
+            rows = rows.take(_smallest(rows[_STRATUM].to_numpy(), rows[_KEY].to_numpy(), quotas))
+        strata = self.allocation.index[rows[_STRATUM].to_numpy()].to_frame(index=False)
+        rows = rows.drop(columns=[_STRATUM, _KEY]).reset_index(drop=True)
+        # The categories of the chunks may differ, so the strata are kept as plain values
+        return rows.assign(**{col: strata[col].to_numpy() for col in STRATA})
+
+
+def sample_chunks(chunks, allocation, granularity=BUCKET_GRANULARITY, seed=0):
+    """Draw a :class:`StratifiedReservoir` of ``allocation`` in one pass over ``chunks``."""
+    reservoir = StratifiedReservoir(allocation, granularity, seed)
+    for chunk in chunks:
+        with stage('sample'):
+            reservoir.update(chunk)
+            count_rows(len(chunk))
+    return reservoir
+
+
+def _z(level):
+    return NormalDist().inv_cdf(0.5 + level / 2)
+
+
+def _design(sample, populations):
+    """The stratum of each row of ``sample``, and the size and sample size of each stratum."""
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(sample[STRATA]))
+    sizes = populations.reindex(uniques).to_numpy(dtype='float64')
+    counts = np.bincount(codes, minlength=len(uniques)).astype('float64')
+    return codes, sizes, counts
+
+
+def _cell_sums(cells, values, cell_count):
+    """The sums of the columns of ``values`` per cell, one row per cell."""
+    return np.column_stack([np.bincount(cells, weights=values[:, col], minlength=cell_count)
+                            for col in range(values.shape[1])])
+
+
+def group_means_ci(sample, populations, columns, by=None, level=0.95):
+    """Estimated means of ``columns`` per group of ``by``, with their confidence intervals.
+
+    ``by`` is a column of ``sample``, a Series aligned with it or ``None``
+    for the means over all rows; ``populations`` are the stratum sizes of
+    :class:`StratumCounts`. Each mean is the stratum-weighted ratio of the
+    sums to the rows of the group, its variance estimated by linearization,
+    with finite population correction. Returns a frame indexed by group,
+    with ``estimate``, ``low`` and ``high`` frames of ``columns``.
+    """
+    if by is None:
+        keys = np.zeros(len(sample), dtype='int64')
+        groups = pd.Index(['All'])
+    else:
+        keys, groups = pd.factorize(sample[by] if isinstance(by, str) else np.asarray(by))
+    codes, sizes, counts = _design(sample, populations)
+    values = sample[list(columns)].to_numpy(dtype='float64')
+    member = keys >= 0
+    # Rows, sums and sums of squares of every (stratum, group) cell
+    cells = codes[member] * len(groups) + keys[member]
+    cell_count = len(sizes) * len(groups)
+    shape = (len(sizes), len(groups), len(columns))
+    rows = np.bincount(cells, minlength=cell_count).reshape(shape[:2])[..., None]
+    sums = _cell_sums(cells, values[member], cell_count).reshape(shape)
+    squares = _cell_sums(cells, values[member] ** 2, cell_count).reshape(shape)
+
+    weights = (sizes / counts)[:, None, None]
+    size = (weights * rows).sum(axis=0)
+    mean = (weights * sums).sum(axis=0) / size
+    # Sums and sums of squares, per stratum, of the linearized residuals (y - mean) / size of each group
+    residuals = (sums - rows * mean) / size
+    squared = (squares - 2 * mean * sums + rows * mean ** 2) / size ** 2
+    n = counts[:, None, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variances = np.where(n > 1, (squared - residuals ** 2 / n) / (n - 1), 0.0)
+    correction = sizes ** 2 * (1 - counts / sizes) / counts
+    margin = _z(level) * np.sqrt(np.maximum(np.tensordot(correction, variances, axes=1), 0))
+
+    index = pd.Index(groups, name=by if isinstance(by, str) else getattr(by, 'name', None))
+    frames = {name: pd.DataFrame(matrix, index=index, columns=list(columns))
+              for name, matrix in [('estimate', mean), ('low', mean - margin), ('high', mean + margin)]}
+    return pd.concat(frames, axis=1).sort_index()
+
+
+def _correlation(total, first, second):
+    """The Pearson correlation matrix from the total weight, weighted sums and weighted cross-products."""
+    mean = first / total
+    covariance = second / total - np.outer(mean, mean)
+    deviations = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.clip(covariance / np.outer(deviations, deviations), -1, 1)
+
+
+def correlation_ci(sample, populations, columns, level=0.95, groups=JACKKNIFE_GROUPS):
+    """Estimated Pearson correlations of ``columns``, with Fisher z confidence intervals.
+
+    The correlations are weighted by stratum. The standard error of their
+    Fisher z transform comes from a delete-a-group jackknife over
+    ``groups`` groups, dealt out stratum by stratum, rather than from
+    ``1 / sqrt(n - 3)``: the ratings are discrete and far from normal, and
+    the normal-theory interval is too narrow for them. Returns ``estimate``,
+    ``low`` and ``high`` correlation matrices, side by side.
+    """
+    codes, sizes, counts = _design(sample, populations)
+    weights = (sizes / counts)[codes]
+    values = sample[list(columns)].to_numpy(dtype='float64')
+    # Deal the rows of each stratum out to the groups in turn
+    order = np.argsort(codes, kind='stable')
+    group = np.empty(len(order), dtype='int64')
+    group[order] = np.arange(len(order)) % groups
+    # Weight, weighted sums and weighted cross-products of each group: each replicate leaves one out
+    totals = np.bincount(group, weights=weights, minlength=groups)
+    firsts = _cell_sums(group, values * weights[:, None], groups)
+    seconds = np.stack([(weights[group == g, None] * values[group == g]).T @ values[group == g]
+                        for g in range(groups)])
+    correlation = _correlation(totals.sum(), firsts.sum(axis=0), seconds.sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        replicates = np.arctanh([_correlation(totals.sum() - totals[g], firsts.sum(axis=0) - firsts[g],
+                                              seconds.sum(axis=0) - seconds[g]) for g in range(groups)])
+        deviation = np.sqrt((groups - 1) / groups * ((replicates - replicates.mean(axis=0)) ** 2).sum(axis=0))
+        fisher = np.arctanh(correlation)
+        low, high = np.tanh(fisher - _z(level) * deviation), np.tanh(fisher + _z(level) * deviation)
+    frames = {name: pd.DataFrame(matrix, index=list(columns), columns=list(columns))
+              for name, matrix in [('estimate', correlation), ('low', low), ('high', high)]}
+    return pd.concat(frames, axis=1)
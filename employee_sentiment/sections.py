@@ -0,0 +1,271 @@
+"""The sections of the analysis, one function each.
+
+Every section reads the columns it needs from the dataset cache and returns
+a dict with:
+
+- ``'tables'``: the tables it reports, keyed by name,
+- ``'figures'``: the data of its figures, keyed by figure name, each value
+  being the tuple of arguments of the figure function in
+  :data:`figures.FIGURES`.
+
+Every section takes a ``where`` :class:`~dataset_index.RowFilter`, to
+run on the rows it keeps only; the rows are found through the index of
+the dataset (see :mod:`dataset_index`). :func:`run` raises a
+:class:`~dataset_index.NoRowsError` for a filter that keeps no rows.
+The sections of 4.1 to 4.4 also take a ``backend`` (see
+:mod:`backends`): ``path`` then names Parquet or CSV shards, and the
+statistics are computed shard by shard on the backend and merged.
+
+``path`` may also be a DataFrame of rows already in memory, typed as the
+dataset cache delivers them, such as the sample of a preview (see
+:mod:`employee_sentiment.preview`). The sections then read it as a single
+chunk, without a cache, index, cube or corpus; such rows are neither
+filtered nor sent to a backend.
+
+Nothing is drawn here, so a section can be imported and run on its own
+without loading the plotting libraries; see :mod:`employee_sentiment.cli`
+for drawing, showing and saving the figures.
+"""
+
+from functools import partial # For tasks with options
+import inspect # For passing each section only the options it takes
+import os # For the comment cache next to the dataset cache
+
+import pandas as pd # For data manipulation
+
+from .aggregations import AGGREGATE_COLUMNS, aggregate_chunks
+from .backends import list_shards
+from .data_loader import CATEGORICAL_COLUMNS, DEFAULT_CHUNKSIZE, NUMERICAL_COLUMNS, TEXT_COLUMNS
+from .dataset_cache import cache_paths, iter_cached, missing_counts
+from .dataset_index import NoRowsError, count_filtered, iter_filtered, load_filtered, row_count_chunks
+from .distributions import BOX_COLUMN, count_chunks
+from .instrumentation import stage
+from .sentiment_scores import label_counts
+from .stats_store import ensure_aggregates
+from .text_cache import CommentCache
+from .text_corpus import iter_corpus
+from .trend_cube import CUBE_COLUMNS, cube_chunks, ensure_cube
+from .word_counts import count_words
+
+DATASET_PATH = 'Dataset.csv'
+
+# Rows of the comment chunks handed to each worker of the text sections, so
+# that every worker gets several of them
+WORKER_CHUNKSIZE = 100_000
+
+
+def open_comment_cache(path=DATASET_PATH):
+    """The cache of per-comment results, kept with the dataset cache of ``path``."""
+    cache_dir = os.path.dirname(cache_paths(path)[0])
+    return CommentCache(os.path.join(cache_dir, 'comments.sqlite'))
+
+
+def _in_memory(path):
+    return isinstance(path, pd.DataFrame)
+
+
+def _reduce(task, path, columns, backend=None, where=None):
+    """Run ``task`` on the chunks of ``columns`` of ``path``, or of the shards at ``path`` with ``backend``.
+
+    Only the rows ``where`` keeps are passed on, when given.
+    """
+    if _in_memory(path):
+        return task([path if columns is None else path[columns]])
+    if backend is None:
+        return task(iter_filtered(path, columns, where))
+    return backend.map_reduce(task, list_shards(path), columns=columns, where=where)
+
+
+def _load(path, columns=None, where=None, limit=None):
+    """The rows ``where`` keeps of ``columns`` of ``path`` in one frame, the first ``limit`` of them."""
+    if _in_memory(path):
+        rows = path if columns is None else path[columns]
+        return rows if limit is None else rows.head(limit)
+    return load_filtered(path, columns=columns, row_filter=where, limit=limit)
+
+
+def _text_chunks(path, where=None, workers=1):
+    """The chunks of the comment columns of ``path``, read from its compact corpus, smaller for ``workers > 1``."""
+    chunksize = WORKER_CHUNKSIZE if workers > 1 else DEFAULT_CHUNKSIZE
+    if _in_memory(path):
+        return [path[TEXT_COLUMNS].iloc[start:start + chunksize] for start in range(0, len(path), chunksize)]
+    return iter_corpus(path, TEXT_COLUMNS, where, chunksize=chunksize)
+
+
+def check_rows(path, where, backend=None):
+    """Raise a :class:`~dataset_index.NoRowsError` if ``where`` keeps no rows of ``path``.
+
+    With ``backend``, the rows kept are counted shard by shard. A filter on
+    a location or engagement answer absent from the dataset raises a
+    ValueError instead.
+    """
+    if backend is None:
+        rows = count_filtered(path, where)
+    else:
+        rows = _reduce(row_count_chunks, path, where.columns, backend, where).rows
+    if not rows:
+        raise NoRowsError(f'No rows match {where!r}')
+
+
+def _check_binned(binned, backend):
+    if not binned and backend is not None:
+        raise ValueError('Raw distributions need every row in memory; use value counts with a backend')
+
+
+def overview(path=DATASET_PATH, where=None):
+    """Sections 2 and 3: the first rows, summary statistics and missing values."""
+    summary = _load(path, ['ID'] + NUMERICAL_COLUMNS, where).describe()
+    if where is None and not _in_memory(path):
+        head = next(iter_cached(path, chunksize=5))
+        missing = missing_counts(path) > 0
+    else:
+        head = _load(path, where=where, limit=5)
+        # Missing comments were cached as empty strings
+        missing = _load(path, where=where).replace({col: '' for col in TEXT_COLUMNS}, None)
+        missing = missing.isnull().any()
+    return {
+        'tables': {
+            'head': head,
+            'summary': summary,
+            'missing': missing,
+        },
+        'figures': {},
+    }
+
+
+def univariate(path=DATASET_PATH, binned=True, backend=None, where=None):
+    """Section 4.1: the distribution of each numerical and categorical column.
+
+    With ``binned``, the histograms are drawn from value counts instead of
+    every row (see :mod:`distributions`).
+    """
+    _check_binned(binned, backend)
+    columns = NUMERICAL_COLUMNS + CATEGORICAL_COLUMNS
+    counts = _reduce(partial(count_chunks, columns=columns, by=[]), path, columns, backend, where)
+    if binned:
+        distributions = ({col: counts.value_counts(col) for col in NUMERICAL_COLUMNS}, True)
+    else:
+        numerical = _load(path, NUMERICAL_COLUMNS, where)
+        distributions = ({col: numerical[col] for col in NUMERICAL_COLUMNS},)
+    return {
+        'tables': {},
+        'figures': {
+            'numerical_distributions': distributions,
+            'categorical_counts': ({col: counts.value_counts(col) for col in CATEGORICAL_COLUMNS},),
+        },
+    }
+
+
+def bivariate(path=DATASET_PATH, binned=True, backend=None, where=None):
+    """Section 4.2: rating correlations, ratings per group and tenure per category.
+
+    The rating statistics of the whole dataset are read from its statistics
+    store (see :mod:`stats_store`), built on the first run. With
+    ``binned``, the tenure boxplots are drawn from value counts instead of
+    every row.
+    """
+    _check_binned(binned, backend)
+    if backend is None and where is None and not _in_memory(path):
+        aggregates = ensure_aggregates(path)
+    else:
+        aggregates = _reduce(aggregate_chunks, path, AGGREGATE_COLUMNS, backend, where)
+    if binned:
+        counts = _reduce(partial(count_chunks, columns=[]), path, [BOX_COLUMN] + CATEGORICAL_COLUMNS, backend, where)
+        boxplots = ({key: counts.group_value_counts(key) for key in CATEGORICAL_COLUMNS}, True)
+    else:
+        boxplots = (_load(path, [BOX_COLUMN] + CATEGORICAL_COLUMNS, where),)
+    return {
+        'tables': {},
+        'figures': {
+            'rating_correlation': (aggregates.correlation(),),
+            'tenure_means': (aggregates.group_means('Employee_Tenure'),),
+            'engagement_location_crosstab': (aggregates.crosstab(),),
+            'category_means': (aggregates.group_means('Employee_Engagement_Activities'),
+                               aggregates.group_means('Location')),
+            'tenure_boxplots': boxplots,
+        },
+    }
+
+
+def word_frequency(path=DATASET_PATH, cache=None, backend=None, where=None, workers=1):
+    """Section 4.3: the most common words of each comment column.
+
+    The comments are read from the compact corpus of the dataset (see
+    :mod:`text_corpus`), and tokenized in ``workers`` processes. Repeated
+    comments are looked up in ``cache`` (a
+    :class:`text_cache.CommentCache`) when one is given; worker processes,
+    and those of a backend, do not use it.
+    """
+    if backend is None:
+        word_counts = count_words(_text_chunks(path, where, workers), cache=cache, workers=workers)
+    else:
+        word_counts = _reduce(count_words, path, TEXT_COLUMNS, backend, where)
+    return {
+        'tables': {'comment_cache': cache.stats()} if cache is not None else {},
+        'figures': {
+            'word_clouds': ({col: counter.frequencies() for col, counter in word_counts.items()},),
+        },
+    }
+
+
+def temporal(path=DATASET_PATH, backend=None, granularity='W', where=None):
+    """Section 4.4: the average of each rating per week, or per period of ``granularity``.
+
+    The averages are read from the rollup cube of the dataset (see
+    :mod:`trend_cube`), built on the first run. A filter on a tenure range
+    does not follow the tenure buckets of the cube, so the kept rows are
+    rolled up in a cube of their own.
+    """
+    cube_where = where.cube_where() if where is not None else (None, None, None)
+    if backend is None and cube_where is not None and not _in_memory(path):
+        trend = ensure_cube(path).trend(granularity, (), *cube_where)
+    else:
+        trend = _reduce(cube_chunks, path, CUBE_COLUMNS, backend, where).trend(granularity)
+    return {
+        'tables': {},
+        'figures': {'weekly_trends': (trend, granularity)},
+    }
+
+
+def sentiment(path=DATASET_PATH, cache=None, where=None, workers=1):
+    """Section 4.5: the number of comments per sentiment label, read from the compact corpus of the dataset.
+
+    The comments are scored in ``workers`` processes, which do not use
+    ``cache``.
+    """
+    counts = label_counts(_text_chunks(path, where, workers), cache=cache, workers=workers)
+    return {
+        'tables': {'label_counts': counts},
+        'figures': {'sentiment_labels': (counts,)},
+    }
+
+
+# Every section, by the name the command line picks it with, in the order of the analysis
+SECTIONS = {
+    'overview': overview,
+    'univariate': univariate,
+    'bivariate': bivariate,
+    'word_frequency': word_frequency,
+    'temporal': temporal,
+    'sentiment': sentiment,
+}
+
+
+def takes(name, option):
+    """Whether section ``name`` takes the keyword argument ``option``."""
+    return option in inspect.signature(SECTIONS[name]).parameters
+
+
+def run(name, path=DATASET_PATH, **options):
+    """Run section ``name`` on ``path``, passing it those of ``options`` it takes.
+
+    Raises a :class:`~dataset_index.NoRowsError` when the ``where`` option
+    keeps no rows, rather than running the section on none.
+    """
+    options = {option: value for option, value in options.items() if takes(name, option)}
+    if _in_memory(path) and (options.get('where') is not None or options.get('backend') is not None):
+        raise ValueError('Rows in memory are neither filtered nor run on a backend')
+    with stage(f'section.{name}'):
+        if options.get('where') is not None:
+            check_rows(path, options['where'], options.get('backend'))
+        return SECTIONS[name](path, **options)
@@ -0,0 +1,160 @@
+"""Lexicon-based sentiment scores for the comment columns.
+
+Each comment is scored offline against a small built-in lexicon of workplace
+vocabulary, weighted from -3 (very negative) to +3 (very positive). A word
+directly preceded by a negation ("not", "no", "never", "don't", ...) has its
+weight flipped. The summed weights ``s`` of a comment are squashed to a
+score in (-1, 1) with ``s / sqrt(s ** 2 + 15)``, the normalization VADER
+uses, and scores beyond +/-0.05 are labelled Positive or Negative.
+
+Scoring is vectorized per batch: the comments of a batch are tokenized in a
+single regex pass into one array of tokens with their row numbers, the tokens are mapped to
+lexicon weights in one lookup (a sparse token matrix times the weight
+vector), and the weights are summed per row with ``np.bincount``. There is
+no Python loop over rows, and repeated comments are scored once (see
+:mod:`text_cache`). As with the word counts, the chunks can be scored in a
+process pool, with the label counts merged in chunk order.
+"""
+
+import numpy as np # For the vectorized sums
+import pandas as pd # For data manipulation
+
+from .data_loader import TEXT_COLUMNS
+from .instrumentation import count_rows, stage
+from .text_cache import namespace_for, process_distinct
+from .word_counts import TOKEN_PATTERN, map_chunks, tokenize_rows
+
+LEXICON = {
+    # Positive
+    'amazing': 3, 'awesome': 3, 'excellent': 3, 'fantastic': 3, 'outstanding': 3, 'love': 3, 'best': 3,
+    'great': 2, 'good': 2, 'nice': 2, 'happy': 2, 'enjoy': 2, 'friendly': 2, 'supportive': 2,
+    'helpful': 2, 'smart': 2, 'talented': 2, 'fun': 2, 'flexible': 2, 'generous': 2, 'rewarding': 2,
+    'fair': 1, 'decent': 1, 'competitive': 1, 'stable': 1, 'collaborative': 2, 'respect': 1,
+    'respected': 2, 'appreciated': 2, 'appreciate': 2, 'recognition': 1, 'growth': 1, 'learn': 1,
+    'learning': 1, 'opportunity': 1, 'opportunities': 1, 'benefit': 1, 'benefits': 1, 'perks': 1,
+    'balance': 1, 'freedom': 1, 'impact': 1, 'innovative': 2, 'exciting': 2, 'inspiring': 2,
+    'transparent': 1, 'trust': 1, 'caring': 2, 'kind': 2, 'easy': 1, 'well': 1, 'better': 1,
+    'improve': 1, 'improved': 1, 'like': 1, 'liked': 1, 'clear': 1, 'secure': 1, 'free': 1,
+    'positive': 2, 'motivated': 2, 'empowered': 2, 'autonomy': 1, 'promotion': 1, 'reward': 1,
+    # Negative
+    'terrible': -3, 'awful': -3, 'horrible': -3, 'worst': -3, 'toxic': -3, 'hate': -3, 'abusive': -3,
+    'bad': -2, 'poor': -2, 'difficult': -2, 'stressful': -2, 'stress': -2, 'unfair': -2, 'rude': -2,
+    'micromanagement': -2, 'micromanaging': -2, 'micromanage': -2, 'politics': -2, 'political': -2,
+    'bureaucracy': -2, 'bureaucratic': -2, 'burnout': -3, 'overworked': -2, 'underpaid': -2,
+    'layoffs': -2, 'layoff': -2, 'chaos': -2, 'chaotic': -2, 'disorganized': -2, 'boring': -2,
+    'frustrating': -2, 'frustrated': -2, 'unclear': -1, 'slow': -1, 'long': -1, 'lack': -2,
+    'lacking': -2, 'limited': -1, 'low': -1, 'hard': -1, 'pressure': -1, 'problem': -1,
+    'problems': -1, 'issue': -1, 'issues': -1, 'worse': -2, 'fear': -2, 'blame': -2, 'ignore': -2,
+    'ignored': -2, 'favoritism': -2, 'unprofessional': -2, 'inconsistent': -1, 'turnover': -1,
+    'overtime': -1, 'commute': -1, 'expensive': -1, 'tedious': -1, 'negative': -2, 'unhappy': -2,
+    'disappointing': -2, 'disconnected': -1, 'nothing': -1, 'cuts': -1, 'politic': -2,
+}
+
+# Words that flip the polarity of the word following them
+NEGATIONS = frozenset(['not', 'no', 'never', 'none', 'nobody', 'neither', 'nor', 'without', 'hardly', 'barely'])
+
+# Normalization constant of the score, as in VADER
+ALPHA = 15
+
+# Scores within this distance of zero are labelled Neutral
+NEUTRAL_BAND = 0.05
+
+LABELS = ['Negative', 'Neutral', 'Positive']
+
+
+def score_column(col):
+    return f'{col}_Sentiment'
+
+
+def label_column(col):
+    return f'{col}_Sentiment_Label'
+
+
+def _score_distinct(comments, lexicon):
+    """Score distinct comments, returning an array of scores."""
+    tokens, rows = tokenize_rows(comments)
+
+    # Index every distinct token once and look up its weight: the sparse token
+    # matrix of the batch times the lexicon weight vector
+    codes, vocabulary = pd.factorize(tokens)
+    vocabulary = pd.Index(vocabulary)
+    weights = vocabulary.map(lexicon).to_numpy(dtype='float64', na_value=0.0)
+    negators = np.asarray(vocabulary.isin(NEGATIONS) | vocabulary.str.endswith("n't"))
+
+    token_weights = weights[codes] if len(codes) else np.zeros(0)
+    negated = np.zeros(len(codes), dtype=bool)
+    negated[1:] = negators[codes[:-1]] & (rows[1:] == rows[:-1])
+    token_weights[negated] *= -1
+
+    sums = np.bincount(rows, weights=token_weights, minlength=len(comments))
+    return sums / np.sqrt(sums ** 2 + ALPHA)
+
+
+def score_texts(texts, lexicon=LEXICON, cache=None):
+    """Score a Series (or :class:`~text_corpus.TextColumn`) of comments, returning a Series of scores in (-1, 1).
+
+    Each distinct comment is scored once, and looked up in ``cache`` first
+    when one is given.
+    """
+    namespace = None
+    if cache is not None:
+        namespace = namespace_for('sentiment', TOKEN_PATTERN, sorted(lexicon.items()), sorted(NEGATIONS), ALPHA)
+    codes, scores, _ = process_distinct(texts, lambda comments: _score_distinct(comments, lexicon), cache, namespace)
+    index = texts.index if isinstance(texts, pd.Series) else None
+    return pd.Series(np.asarray(scores, dtype='float64')[codes], index=index)
+
+
+def label_scores(scores):
+    """Label scores as Negative, Neutral or Positive."""
+    bins = [-np.inf, -NEUTRAL_BAND, NEUTRAL_BAND, np.inf]
+    return pd.cut(scores, bins=bins, labels=LABELS, right=False)
+
+
+def score_comments(frame, columns=TEXT_COLUMNS, batch_size=100_000, cache=None):
+    """Add a score and a label column for each comment column of ``frame``.
+
+    The comments are scored ``batch_size`` rows at a time. Returns ``frame``.
+    """
+    for col in columns:
+        scores = [score_texts(frame[col].iloc[start:start + batch_size], cache=cache).to_numpy()
+                  for start in range(0, len(frame), batch_size)]
+        frame[score_column(col)] = np.concatenate(scores) if scores else np.zeros(0)
+        frame[label_column(col)] = label_scores(frame[score_column(col)])
+    return frame
+
+
+def score_chunks(chunks, columns=TEXT_COLUMNS, cache=None):
+    """Yield ``chunks`` with the sentiment columns added."""
+    for chunk in chunks:
+        yield score_comments(chunk, columns=columns, batch_size=len(chunk) or 1, cache=cache)
+
+
+def _count_labels(chunk, columns, cache=None):
+    """Number of comments of ``chunk`` per sentiment label, with a column per comment column."""
+    counts = pd.DataFrame(0, index=LABELS, columns=list(columns))
+    for col in columns:
+        labels = label_scores(score_texts(chunk[col], cache=cache))
+        counts[col] += labels.value_counts().reindex(LABELS, fill_value=0)
+    return counts
+
+
+def label_counts(chunks, columns=TEXT_COLUMNS, cache=None, workers=1):
+    """Number of comments per sentiment label, with a column per comment column.
+
+    Chunks are DataFrames or :class:`~text_corpus.TextCorpus` chunks. With
+    ``workers > 1`` they are scored in that many processes, which do not
+    use ``cache``.
+    """
+    counts = pd.DataFrame(0, index=LABELS, columns=list(columns))
+    if workers <= 1:
+        for chunk in chunks:
+            with stage('sentiment'):
+                counts += _count_labels(chunk, columns, cache)
+                count_rows(len(chunk))
+        return counts
+    with stage('sentiment'):
+        for part, rows in map_chunks(_count_labels, (chunk[list(columns)] for chunk in chunks), workers,
+                                     list(columns)):
+            counts += part
+            count_rows(rows)
+    return counts
@@ -0,0 +1,376 @@
+"""Local HTTP service serving the results of the sections on demand.
+
+Dashboards pull the tables and figures of the analysis from a long-running
+process instead of rerunning the script. The service runs on asyncio with
+the standard library only, and listens on localhost by default:
+
+- ``GET /`` lists the sections and figures,
+- ``GET /sections/<section>`` returns the tables and figure data of a
+  section as JSON,
+- ``GET /figures/<figure>.json`` returns the data of one figure (e.g.
+  ``rating_correlation``, ``tenure_means``, ``category_means``,
+  ``engagement_location_crosstab``, ``word_clouds``, ``weekly_trends``),
+- ``GET /figures/<figure>.png`` returns the figure drawn as PNG.
+
+Every request takes the row filter of :mod:`dataset_index` as query
+parameters (``location``, ``engagement``, ``min_tenure``, ``max_tenure``,
+``start``, ``end``, ``period``, the first two repeatable) and
+``granularity`` for the trends, e.g. ``/figures/weekly_trends.png?location=CityA&period=2023Q3``.
+An unknown location or engagement answer is a 400 error, and a filter
+keeping no rows a 404.
+
+Results are kept in a :class:`ResultCache`, keyed by the dataset version
+(the digest of the source file), the result and the query, and evicted
+after ``--ttl`` seconds or when it holds more than ``--max-entries``
+results, least recently used first. Concurrent requests for a result
+being computed wait for the same computation. Sections run and figures are
+drawn in a process pool, and JSON is encoded in a thread, so the event
+loop only ever parses requests and writes responses. The ``X-Cache``
+response header tells whether a result was a ``hit``, a ``miss`` or
+``coalesced`` with a running computation. The dataset cache, index, cube
+and corpus are built by the service itself, once per version of the
+dataset, before any worker reads them.
+
+Usage::
+
+    python -m employee_sentiment.service --dataset Dataset.csv --port 8000 --workers 2
+"""
+
+import argparse # For the command line interface and the row filter options
+import asyncio # For the server
+import io # For the PNG buffers
+import json # For the JSON responses
+import multiprocessing # For starting the workers without the open connections
+import time # For the result expiry
+from collections import OrderedDict # For the LRU order of the results
+from concurrent.futures import ProcessPoolExecutor # For the sections and figures
+from http import HTTPStatus # For the status lines
+from urllib.parse import parse_qs, urlsplit # For the request targets
+
+import pandas as pd # For encoding the tables
+
+from .dataset_cache import ensure_cache
+from .dataset_index import NoRowsError, check_filter, ensure_index, filter_from_args
+from .sections import DATASET_PATH, SECTIONS, run
+from .stats_store import ensure_aggregates
+from .text_corpus import ensure_corpus
+from .trend_cube import GRANULARITIES, ensure_cube
+
+# The section computing each figure
+FIGURE_SECTIONS = {
+    'numerical_distributions': 'univariate',
+    'categorical_counts': 'univariate',
+    'rating_correlation': 'bivariate',
+    'tenure_means': 'bivariate',
+    'engagement_location_crosstab': 'bivariate',
+    'category_means': 'bivariate',
+    'tenure_boxplots': 'bivariate',
+    'word_clouds': 'word_frequency',
+    'weekly_trends': 'temporal',
+    'sentiment_labels': 'sentiment',
+}
+
+# Query parameters that can be given several times
+LIST_PARAMETERS = ['location', 'engagement']
+INT_PARAMETERS = ['min_tenure', 'max_tenure']
+PARAMETERS = LIST_PARAMETERS + INT_PARAMETERS + ['start', 'end', 'period', 'granularity']
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class ResultCache:
+    """Results by key, expiring after ``ttl`` seconds and bounded to ``max_entries``, least recently used first.
+
+    :meth:`get` computes a missing result once, however many requests ask
+    for it while it is being computed.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._pending = {}
+        self.hits = self.misses = self.coalesced = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key, compute):
+        """The result of ``key`` and whether it was a 'hit', a 'miss' or 'coalesced'.
+
+        ``compute`` is a coroutine function returning the result; results
+        of failed computations are not kept.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1], 'hit'
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+            status = 'coalesced'
+        else:
+            self.misses += 1
+            status = 'miss'
+            task = self._pending[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # A client going away must not cancel the computation others wait for
+        return await asyncio.shield(task), status
+
+    def _finish(self, key, task):
+        del self._pending[key]
+        if not task.cancelled() and task.exception() is None:
+            self._store(key, task.result())
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced}
+
+
+def to_jsonable(value):
+    """Turn tables, arrays and containers of them into JSON-serializable values.
+
+    Frames and Series are encoded in pandas' ``split`` orientation, with
+    dates in ISO format and missing values as null.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return json.loads(value.to_json(orient='split', date_format='iso'))
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return value
+
+
+def encode_json(value):
+    return json.dumps(to_jsonable(value)).encode('utf-8')
+
+
+def prepare_dataset(path):
+    """Build the cache of the dataset and every file derived from it: the index, statistics, cube and corpus.
+
+    Returns the cache metadata.
+    """
+    meta = ensure_cache(path)
+    ensure_index(path)
+    ensure_aggregates(path)
+    ensure_cube(path)
+    ensure_corpus(path)
+    return meta
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def run_section(name, path, where=None, granularity='W'):
+    """Run section ``name`` in a worker process."""
+    return run(name, path, where=where, granularity=granularity)
+
+
+def render_png(name, args):
+    """Draw figure ``name`` from its data in a worker process, returning the PNG bytes."""
+    import matplotlib.pyplot as plt
+    from .figures import FIGURES
+
+    fig = FIGURES[name](*args)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def parse_query(query):
+    """The row filter and options of a query string, and their canonical form for the cache keys."""
+    params = parse_qs(query, keep_blank_values=True)
+    unknown = sorted(set(params) - set(PARAMETERS))
+    if unknown:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f'Unknown parameters: {", ".join(unknown)}')
+    options = {name: None for name in PARAMETERS}
+    for name, values in params.items():
+        if name not in LIST_PARAMETERS and len(values) > 1:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f'{name} can only be given once')
+        options[name] = sorted(values) if name in LIST_PARAMETERS else values[0]
+    granularity = options.pop('granularity') or 'W'
+    if granularity not in GRANULARITIES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f'granularity must be one of {", ".join(GRANULARITIES)}')
+    try:
+        for name in INT_PARAMETERS:
+            if options[name] is not None:
+                options[name] = int(options[name])
+        where = filter_from_args(argparse.Namespace(**options))
+    except ValueError as error:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, str(error)) from error
+    key = tuple((name, tuple(value) if isinstance(value, list) else value)
+                for name, value in sorted(options.items()) if value is not None)
+    return where, granularity, key + (('granularity', granularity),)
+
+
+class ReportService:
+    """The results of the sections of the dataset at ``path``, served over HTTP."""
+
+    def __init__(self, path=DATASET_PATH, workers=None, max_entries=256, ttl=3600.0):
+        self.path = path
+        self.cache = ResultCache(max_entries, ttl)
+        # Forked workers would inherit the sockets of the open connections and
+        # keep them open after the response, so they are started from a server
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        mp_context=multiprocessing.get_context('forkserver'))
+        self._version_lock = asyncio.Lock()
+        self._prepared = None
+
+    async def dataset_version(self):
+        """The digest of the dataset, rebuilding its cache and derived files first if the file changed."""
+        # One build at a time, here rather than in the workers: concurrent
+        # builds would write the same files
+        async with self._version_lock:
+            meta = await asyncio.to_thread(ensure_cache, self.path)
+            if meta['sha256'] != self._prepared:
+                meta = await asyncio.to_thread(prepare_dataset, self.path)
+                self._prepared = meta['sha256']
+        return meta['sha256']
+
+    async def section(self, name, version, where, granularity, options):
+        loop = asyncio.get_running_loop()
+        return await self.cache.get(
+            (version, 'section', name, options),
+            lambda: loop.run_in_executor(self.pool, run_section, name, self.path, where, granularity))
+
+    async def respond(self, method, target):
+        """The status, content type, body and cache status answering a request."""
+        if method != 'GET':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        if not parts:
+            return 'application/json', encode_json({
+                'sections': list(SECTIONS), 'figures': list(FIGURE_SECTIONS), 'cache': self.cache.stats(),
+            }), None
+        where, granularity, options = parse_query(url.query)
+        if len(parts) != 2 or parts[0] not in ('sections', 'figures'):
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        version = await self.dataset_version()
+        if where is not None:
+            try:
+                await asyncio.to_thread(check_filter, self.path, where)
+            except ValueError as error:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(error)) from error
+        loop = asyncio.get_running_loop()
+
+        if parts[0] == 'sections':
+            name = parts[1]
+            if name not in SECTIONS:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f'Unknown section {name!r}')
+
+            async def compute():
+                result, _ = await self.section(name, version, where, granularity, options)
+                return await asyncio.to_thread(encode_json, result)
+            body, status = await self.cache.get((version, 'section.json', name, options), compute)
+            return 'application/json', body, status
+
+        name, _, extension = parts[1].rpartition('.')
+        if name not in FIGURE_SECTIONS or extension not in ('json', 'png'):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'Unknown figure {parts[1]!r}')
+
+        async def compute():
+            result, _ = await self.section(FIGURE_SECTIONS[name], version, where, granularity, options)
+            args = result['figures'][name]
+            if extension == 'json':
+                return await asyncio.to_thread(encode_json, args)
+            return await loop.run_in_executor(self.pool, render_png, name, args)
+        body, status = await self.cache.get((version, extension, name, options), compute)
+        return 'application/json' if extension == 'json' else 'image/png', body, status
+
+    async def handle(self, reader, writer):
+        """Answer one request on a connection, then close it."""
+        cache_status = None
+        try:
+            request_line = (await reader.readline()).decode('latin-1')
+            # The headers are not used
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            try:
+                method, target, _ = request_line.split(' ', 2)
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, 'Malformed request line') from None
+            content_type, body, cache_status = await self.respond(method, target)
+            status = HTTPStatus.OK
+        except HTTPError as error:
+            status, content_type, body = error.status, 'application/json', encode_json({'error': str(error)})
+        except NoRowsError as error:
+            status, content_type, body = HTTPStatus.NOT_FOUND, 'application/json', encode_json({'error': str(error)})
+        except Exception as error: # Reported to the client rather than dropping the connection
+            status, content_type = HTTPStatus.INTERNAL_SERVER_ERROR, 'application/json'
+            body = encode_json({'error': f'{type(error).__name__}: {error}'})
+        headers = [
+            f'HTTP/1.1 {status.value} {status.phrase}',
+            f'Content-Type: {content_type}',
+            f'Content-Length: {len(body)}',
+            'Connection: close',
+        ]
+        if cache_status is not None:
+            headers.append(f'X-Cache: {cache_status}')
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f'Serving {self.path} on http://{host}:{port}/', flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--dataset', default=DATASET_PATH, help='path of the feedback CSV')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes running the sections and drawing the figures (default: one per core)')
+    parser.add_argument('--max-entries', type=int, default=256, help='results kept in the cache')
+    parser.add_argument('--ttl', type=float, default=3600.0, help='seconds a result is kept in the cache')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        service = ReportService(args.dataset, args.workers, args.max_entries, args.ttl)
+        try:
+            await service.serve(args.host, args.port)
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
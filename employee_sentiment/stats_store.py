@@ -0,0 +1,145 @@
+"""Persistent, incrementally updated store of the rating reports.
+
+New feedback arrives in daily batches. Instead of recomputing the reports of
+sections 4.2 and 4.4 over the whole history, the store keeps the
+:class:`~aggregations.RatingAggregator` statistics on disk: appending a batch
+only aggregates the batch and adds it to the stored totals, and the reports
+are read straight from the totals.
+
+:func:`ensure_aggregates` keeps such a store with the dataset cache, which
+section 4.2 reads its reports from.
+
+Usage::
+
+    python -m employee_sentiment.stats_store seed stats.pkl Dataset.csv
+    python -m employee_sentiment.stats_store append stats.pkl new_feedback.csv
+    python -m employee_sentiment.stats_store verify stats.pkl Dataset.csv new_feedback.csv
+"""
+
+import argparse # For the command line interface
+import os # For atomic replacement of the store file
+import pickle # For serializing the statistics
+
+import pandas as pd # For data manipulation
+
+from .aggregations import AGGREGATE_COLUMNS, RatingAggregator, aggregate_chunks
+from .data_loader import iter_dataset
+from .dataset_cache import (_has_pyarrow, _read_metadata, _temp_path, _write_json, cache_paths, covered_rows,
+                            ensure_cache, iter_cached)
+
+# Bump whenever the statistics or their storage change, to invalidate old stores
+STORE_VERSION = 1
+
+
+class StatisticsStore:
+    """Rating statistics persisted at ``path`` and extended batch by batch.
+
+    The statistics are read from ``path`` unless ``aggregates`` are given.
+    """
+
+    def __init__(self, path, aggregates=None):
+        self.path = path
+        if aggregates is not None:
+            self.aggregates = aggregates
+        elif os.path.exists(path):
+            with open(path, 'rb') as handle:
+                self.aggregates = pickle.load(handle)
+        else:
+            self.aggregates = RatingAggregator()
+
+    def save(self, **metadata):
+        """Write the statistics to disk, and their metadata next to them, replacing the previous files atomically."""
+        tmp_path = _temp_path(self.path)
+        with open(tmp_path, 'wb') as handle:
+            pickle.dump(self.aggregates, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        _write_json(_meta_path(self.path), {'version': STORE_VERSION, 'rows': self.rows, **metadata})
+
+    def append(self, chunks):
+        """Add a batch, given as an iterable of chunks, and save the store."""
+        batch = aggregate_chunks(chunks, self.aggregates.columns)
+        self.aggregates.merge(batch)
+        self.save()
+        return batch.rows
+
+    @property
+    def rows(self):
+        return self.aggregates.rows
+
+    def reports(self):
+        """All rating reports, keyed by name."""
+        return self.aggregates.reports()
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def ensure_aggregates(path, cache_dir=None):
+    """The rating statistics of the dataset at ``path``, from a store kept with its dataset cache.
+
+    When feedback has only been appended to the dataset, the new rows are
+    added to the store; any other change rebuilds it. Without Parquet
+    support, the statistics are aggregated from the CSV on every call.
+    """
+    if not _has_pyarrow():
+        return aggregate_chunks(iter_cached(path, columns=AGGREGATE_COLUMNS, cache_dir=cache_dir))
+    meta = ensure_cache(path, cache_dir)
+    store_path = os.path.splitext(cache_paths(path, cache_dir)[0])[0] + '.stats.pkl'
+    store_meta = _read_metadata(_meta_path(store_path))
+    covered = None
+    if store_meta is not None and store_meta.get('version') == STORE_VERSION and os.path.exists(store_path):
+        covered = covered_rows(path, store_meta, cache_dir)
+    if covered == meta['rows']:
+        return StatisticsStore(store_path).aggregates
+    store = StatisticsStore(store_path, None if covered else RatingAggregator())
+    store.aggregates.merge(aggregate_chunks(iter_cached(path, columns=AGGREGATE_COLUMNS, cache_dir=cache_dir,
+                                                        first_row=covered or 0)))
+    store.save(sha256=meta['sha256'], size=meta['size'])
+    return store.aggregates
+
+
+def verify(store, chunks, rtol=1e-12):
+    """Check that the store's reports equal a full recompute over ``chunks``.
+
+    Returns the names of the reports that differ; an empty list means the
+    incremental results match.
+    """
+    expected = aggregate_chunks(chunks, store.aggregates.columns).reports()
+    mismatches = []
+    for name, report in store.reports().items():
+        try:
+            pd.testing.assert_frame_equal(report, expected[name], check_exact=False, rtol=rtol)
+        except AssertionError:
+            mismatches.append(name)
+    return mismatches
+
+
+def _iter_files(paths):
+    for path in paths:
+        yield from iter_dataset(path, columns=AGGREGATE_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('command', choices=['seed', 'append', 'verify'])
+    parser.add_argument('store', help='path of the statistics store')
+    parser.add_argument('csv', nargs='+', help='feedback CSV files, oldest first')
+    args = parser.parse_args(argv)
+
+    if args.command == 'seed' and os.path.exists(args.store):
+        os.remove(args.store)
+    store = StatisticsStore(args.store)
+    if args.command == 'verify':
+        mismatches = verify(store, _iter_files(args.csv))
+        if mismatches:
+            parser.exit(1, f'Reports differ from a full recompute: {", ".join(mismatches)}\n')
+        print(f'All reports match a full recompute over {store.rows} rows')
+        return
+    for path in args.csv:
+        rows = store.append(iter_dataset(path, columns=AGGREGATE_COLUMNS))
+        print(f'Added {rows} rows from {path}; the store now covers {store.rows} rows')
+
+
+if __name__ == '__main__':
+    main()
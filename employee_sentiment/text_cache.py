@@ -0,0 +1,167 @@
+"""Deduplication and on-disk memoization of per-comment results.
+
+Employee comments repeat heavily ("good pay", "none", ...). The text stages
+therefore work on the distinct comments of a batch only: comments are
+normalized (lower-cased, whitespace collapsed), factorized, and each
+distinct comment is processed once, its result reused for every occurrence.
+
+Results can also be kept across runs in a :class:`CommentCache`, an SQLite
+key-value store addressed by the SHA-1 of the normalized comment. The cache
+is bounded to ``max_entries`` and evicts the least recently used entries.
+Results of different stages (and of different stopword lists or lexicons)
+live in separate namespaces. A lookup costs about as much as the vectorized
+stages spend on a comment, so the cache only pays off when the same
+comments come back run after run.
+"""
+
+import hashlib # For content addressing
+import os # For creating the cache directory
+import pickle # For serializing cached results
+import sqlite3 # For the on-disk store
+
+import numpy as np # For counting occurrences
+import pandas as pd # For data manipulation
+
+# SQLite limits the number of parameters of one statement
+_BATCH = 500
+
+
+def normalize_comments(texts):
+    """Lower-case comments and collapse runs of whitespace into single spaces."""
+    return texts.fillna('').str.lower().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def deduplicate(texts):
+    """Factorize normalized comments, a Series or a :class:`~text_corpus.TextColumn`.
+
+    Returns ``(codes, uniques, counts)``: the position of each comment's
+    distinct value in ``uniques``, the distinct normalized comments, and how
+    often each of them occurs. A text column is factorized on its bytes
+    first, so only its distinct comments are normalized.
+    """
+    if isinstance(texts, pd.Series):
+        codes, uniques = pd.factorize(normalize_comments(texts))
+    else:
+        raw_codes, raw_uniques = texts.factorize()
+        codes, uniques = pd.factorize(normalize_comments(raw_uniques))
+        codes = codes[raw_codes]
+    counts = np.bincount(codes, minlength=len(uniques))
+    return codes, pd.Series(uniques, dtype=object), counts
+
+
+def content_key(text):
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+def namespace_for(stage, *parameters):
+    """A namespace for ``stage`` that changes whenever its ``parameters`` change."""
+    digest = hashlib.sha1(repr(parameters).encode('utf-8')).hexdigest()[:12]
+    return f'{stage}:{digest}'
+
+
+class CommentCache:
+    """Bounded, LRU-evicted on-disk store of per-comment results."""
+
+    def __init__(self, path, max_entries=1_000_000):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' namespace TEXT NOT NULL, key BLOB NOT NULL, value BLOB NOT NULL, last_used INTEGER NOT NULL,'
+            ' PRIMARY KEY (namespace, key))')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        self.clock = self.connection.execute('SELECT COALESCE(MAX(last_used), 0) FROM results').fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.rows = 0
+        self.unique = 0
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_many(self, namespace, keys):
+        """Look up ``keys``, returning a dict of the ones found."""
+        found = {}
+        for start in range(0, len(keys), _BATCH):
+            batch = keys[start:start + _BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.connection.execute(
+                f'SELECT key, value FROM results WHERE namespace = ? AND key IN ({placeholders})',
+                [namespace, *batch])
+            found.update((key, pickle.loads(value)) for key, value in rows)
+        if found:
+            self.clock += 1
+            with self.connection:
+                self.connection.executemany(
+                    'UPDATE results SET last_used = ? WHERE namespace = ? AND key = ?',
+                    [(self.clock, namespace, key) for key in found])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, namespace, items):
+        """Store ``(key, value)`` pairs, evicting the least recently used entries beyond the bound."""
+        self.clock += 1
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO results (namespace, key, value, last_used) VALUES (?, ?, ?, ?)',
+                [(namespace, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.clock)
+                 for key, value in items])
+            excess = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute(
+                    'DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)',
+                    (excess,))
+
+    def stats(self):
+        """Hit rate of the cache and the share of comments saved by deduplication."""
+        lookups = self.hits + self.misses
+        return {
+            'rows': self.rows,
+            'unique': self.unique,
+            'dedup_ratio': 1 - self.unique / self.rows if self.rows else 0.0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def process_distinct(texts, compute, cache=None, namespace=None):
+    """Run ``compute`` once per distinct comment of ``texts``.
+
+    Returns ``(codes, results, counts)`` as :func:`deduplicate` does, with
+    the result of each distinct comment in place of the comment itself.
+    """
+    codes, uniques, counts = deduplicate(texts)
+    if cache is not None:
+        cache.rows += len(texts)
+        cache.unique += len(uniques)
+    return codes, memoize(uniques, compute, cache, namespace), counts
+
+
+def memoize(uniques, compute, cache=None, namespace=None):
+    """Results of ``compute`` for each distinct comment, through ``cache``.
+
+    ``compute`` takes a Series of distinct normalized comments and returns a
+    sequence of results aligned with it; it is only called for the comments
+    missing from the cache. Returns a list aligned with ``uniques``.
+    """
+    if cache is None:
+        return list(compute(uniques))
+    keys = [content_key(text) for text in uniques]
+    found = cache.get_many(namespace, keys)
+    missing = [i for i, key in enumerate(keys) if key not in found]
+    if missing:
+        computed = list(compute(uniques.iloc[missing].reset_index(drop=True)))
+        cache.put_many(namespace, [(keys[i], value) for i, value in zip(missing, computed)])
+        found.update((keys[i], value) for i, value in zip(missing, computed))
+    return [found[key] for key in keys]
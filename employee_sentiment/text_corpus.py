@@ -0,0 +1,330 @@
+"""Compact, memory-mapped store of the comment columns.
+
+Read into an ``object`` column (the pandas 2 default), every comment is a
+Python ``str`` of its own: about 50 bytes of object header on top of its
+text, plus an 8-byte pointer in the column. For the short comments of the
+survey that overhead outweighs the text itself. Here a comment column is
+kept instead as a
+:class:`TextColumn`: the UTF-8 bytes of all its comments end to end in one
+buffer, and an array of ``rows + 1`` offsets, comment ``i`` being
+``data[offsets[i]:offsets[i + 1]]``. That is the layout of an Arrow
+``large_string`` array, so a column converts to Arrow without a copy.
+
+The comment columns of a dataset are written once to a corpus file kept
+with its dataset cache, and memory-mapped on later runs: only the pages
+read are loaded, they are shared between processes, and nothing is decoded
+from Parquet. The text sections
+read the corpus in chunks (:func:`iter_corpus`). Comments are deduplicated
+on their bytes with Arrow (see :meth:`TextColumn.factorize`), so only the
+distinct comments of a chunk ever become Python strings.
+
+Missing comments are stored as empty strings, as in the dataset cache.
+Without ``pyarrow``, the text sections read the dataset as before.
+
+Usage::
+
+    python -m employee_sentiment.text_corpus Dataset.csv
+"""
+
+import argparse # For the command line interface
+import os # For atomic replacement of the corpus files
+import shutil # For assembling the corpus file
+import tempfile # For the columns while they are written
+
+import numpy as np # For the buffers
+import pandas as pd # For data manipulation
+
+from .data_loader import DEFAULT_CHUNKSIZE, TEXT_COLUMNS
+from .dataset_cache import _has_pyarrow, _read_metadata, _temp_path, _write_json, cache_paths, ensure_cache, iter_cached
+from .dataset_index import ensure_index, iter_filtered
+from .instrumentation import count_rows, stage
+
+# Bump whenever the layout of the corpus file changes, to invalidate old corpora
+CORPUS_VERSION = 1
+
+# Alignment of the arrays in the corpus file
+_ALIGNMENT = 8
+
+
+class TextColumn:
+    """The comments of one column, as a UTF-8 buffer and the offsets of each comment in it."""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts):
+        """A column of ``texts``: an Arrow string array, or a sequence of ``str``."""
+        if hasattr(texts, 'buffers'):
+            return cls.from_arrow(texts)
+        encoded = [text.encode('utf-8') if isinstance(text, str) else b'' for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype='int64')
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype='uint8'), offsets)
+
+    @classmethod
+    def from_arrow(cls, array):
+        """A column of an Arrow ``string`` or ``large_string`` array; nulls become empty comments."""
+        import pyarrow as pa
+
+        offset_type = 'int64' if pa.types.is_large_string(array.type) else 'int32'
+        _, offsets, data = array.buffers()
+        offsets = np.frombuffer(offsets, dtype=offset_type)[array.offset:array.offset + len(array) + 1]
+        offsets = offsets.astype('int64')
+        data = np.frombuffer(data, dtype='uint8') if data is not None else np.zeros(0, dtype='uint8')
+        return cls(data, offsets).slice(0, len(array))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError('Text columns only take contiguous slices')
+            return self.slice(start, stop)
+        return bytes(self.data[self.offsets[item]:self.offsets[item + 1]]).decode('utf-8')
+
+    def slice(self, start, stop):
+        """The comments ``start`` to ``stop``, sharing this column's buffer."""
+        stop = max(start, stop)
+        first, last = self.offsets[start], self.offsets[stop]
+        return TextColumn(self.data[first:last], self.offsets[start:stop + 1] - first)
+
+    def take(self, rows):
+        """The comments of ``rows``, in that order, copied into a new buffer."""
+        rows = np.asarray(rows, dtype='int64')
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype='int64')
+        np.cumsum(lengths, out=offsets[1:])
+        # The source position of every byte: its comment's start, then one byte after the other
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return TextColumn(self.data[positions], offsets)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes
+
+    def to_arrow(self):
+        """The column as an Arrow ``large_string`` array, without copying."""
+        import pyarrow as pa
+
+        return pa.LargeStringArray.from_buffers(
+            len(self), pa.py_buffer(np.ascontiguousarray(self.offsets)), pa.py_buffer(self.data))
+
+    def to_series(self):
+        """The column as a pandas Series of ``str``, one object per comment."""
+        if _has_pyarrow():
+            return pd.Series(self.to_arrow().to_numpy(zero_copy_only=False), dtype=object)
+        return pd.Series([self[i] for i in range(len(self))], dtype=object)
+
+    def factorize(self):
+        """Factorize the comments on their bytes, like ``pd.factorize``.
+
+        Returns ``(codes, uniques)``, ``uniques`` a Series of the distinct
+        comments in the order they first occur. Only those become Python
+        strings.
+        """
+        if not _has_pyarrow():
+            codes, uniques = pd.factorize(self.to_series())
+            return codes, pd.Series(uniques, dtype=object)
+        encoded = self.to_arrow().dictionary_encode()
+        codes = encoded.indices.to_numpy(zero_copy_only=False).astype('intp')
+        return codes, pd.Series(encoded.dictionary.to_pylist(), dtype=object)
+
+
+class TextCorpus:
+    """Comment columns of the same rows, by name, each a :class:`TextColumn`.
+
+    Indexed like a DataFrame: ``corpus[col]`` is a column and
+    ``corpus[[col, ...]]`` a corpus of those columns.
+    """
+
+    def __init__(self, columns):
+        self._columns = dict(columns)
+        lengths = {len(column) for column in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError('The columns of a corpus must have the same number of rows')
+        self.rows = lengths.pop() if lengths else 0
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._columns[key]
+        return TextCorpus({col: self._columns[col] for col in key})
+
+    def slice(self, start, stop):
+        return TextCorpus({col: column.slice(start, stop) for col, column in self._columns.items()})
+
+    def take(self, rows):
+        return TextCorpus({col: column.take(rows) for col, column in self._columns.items()})
+
+    def iter_chunks(self, chunksize=DEFAULT_CHUNKSIZE, rows=None):
+        """Yield the corpus, or its ``rows``, ``chunksize`` rows at a time.
+
+        Slices of the corpus share its buffers; the comments of ``rows`` are
+        copied, one chunk at a time.
+        """
+        total = self.rows if rows is None else len(rows)
+        for start in range(0, total, chunksize):
+            with stage('read_corpus'):
+                if rows is None:
+                    chunk = self.slice(start, min(start + chunksize, total))
+                else:
+                    chunk = self.take(rows[start:start + chunksize])
+                count_rows(len(chunk))
+            yield chunk
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns.values())
+
+    def to_frame(self):
+        """The corpus as a DataFrame of ``str`` columns."""
+        return pd.DataFrame({col: column.to_series() for col, column in self._columns.items()})
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map the corpus file ``path``, returning the corpus and its metadata."""
+        meta = _read_metadata(_meta_path(path))
+        if meta is None:
+            raise FileNotFoundError(f'No corpus metadata next to {path}')
+        columns = {}
+        for col, layout in meta['columns'].items():
+            data_start, data_size = layout['data']
+            offsets_start, offsets_count = layout['offsets']
+            data = np.memmap(path, dtype='uint8', mode='r', offset=data_start, shape=(data_size,)) \
+                if data_size else np.zeros(0, dtype='uint8')
+            offsets = np.memmap(path, dtype='int64', mode='r', offset=offsets_start, shape=(offsets_count,))
+            columns[col] = TextColumn(data, offsets)
+        return cls(columns), meta
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _pad(handle):
+    handle.write(b'\0' * (-handle.tell() % _ALIGNMENT))
+
+
+def write_corpus(chunks, path, columns=TEXT_COLUMNS, **metadata):
+    """Write the comment ``columns`` of ``chunks`` (DataFrames or Arrow record batches) to the corpus file ``path``.
+
+    Each column's buffer is written to a temporary file as the chunks go
+    by, so only the offsets are held in memory; the buffers and offsets are
+    then laid out column after column. Returns the metadata.
+    """
+    offsets = {col: [np.zeros(1, dtype='int64')] for col in columns}
+    sizes = dict.fromkeys(columns, 0)
+    rows = 0
+    buffers = {col: tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) for col in columns}
+    try:
+        for chunk in chunks:
+            with stage('corpus_build'):
+                for col in columns:
+                    column = TextColumn.from_texts(chunk[col])
+                    buffers[col].write(column.data.tobytes())
+                    offsets[col].append(column.offsets[1:] + sizes[col])
+                    sizes[col] += column.data.nbytes
+                rows += len(chunk)
+                count_rows(len(chunk))
+        layout = {}
+        tmp_path = _temp_path(path)
+        with open(tmp_path, 'wb') as handle:
+            for col in columns:
+                data_start = handle.tell()
+                buffers[col].seek(0)
+                shutil.copyfileobj(buffers[col], handle)
+                _pad(handle)
+                column_offsets = np.concatenate(offsets[col])
+                layout[col] = {'data': [data_start, sizes[col]], 'offsets': [handle.tell(), len(column_offsets)]}
+                handle.write(column_offsets.tobytes())
+    finally:
+        for buffer in buffers.values():
+            buffer.close()
+    os.replace(tmp_path, path)
+    meta = {'version': CORPUS_VERSION, 'rows': rows, 'columns': layout, **metadata}
+    _write_json(_meta_path(path), meta)
+    return meta
+
+
+def corpus_path(path, cache_dir=None):
+    """The path of the corpus file of the dataset at ``path``."""
+    return os.path.splitext(cache_paths(path, cache_dir)[0])[0] + '.corpus.bin'
+
+
+def ensure_corpus(path, cache_dir=None):
+    """The memory-mapped corpus of the dataset at ``path``, kept with its dataset cache.
+
+    The corpus is written from the dataset cache, one Arrow batch at a
+    time, and rewritten whenever the dataset changes. Needs ``pyarrow``.
+    """
+    import pyarrow.parquet as pq
+
+    meta = ensure_cache(path, cache_dir)
+    target = corpus_path(path, cache_dir)
+    corpus_meta = _read_metadata(_meta_path(target))
+    if corpus_meta is None or corpus_meta.get('version') != CORPUS_VERSION \
+            or corpus_meta.get('sha256') != meta['sha256'] or not os.path.exists(target):
+        parquet_file = pq.ParquetFile(cache_paths(path, cache_dir)[0], memory_map=True)
+        write_corpus(parquet_file.iter_batches(columns=TEXT_COLUMNS), target, sha256=meta['sha256'])
+    return TextCorpus.load(target)[0]
+
+
+def iter_corpus(path, columns=TEXT_COLUMNS, row_filter=None, chunksize=DEFAULT_CHUNKSIZE, cache_dir=None):
+    """Yield the comment ``columns`` of the dataset in chunks, as :class:`TextCorpus` slices.
+
+    With ``row_filter`` (a :class:`~dataset_index.RowFilter`), only the
+    rows it keeps, found through the dataset index. Without ``pyarrow``,
+    the chunks are DataFrames read by :func:`dataset_index.iter_filtered`.
+    """
+    if not _has_pyarrow():
+        yield from iter_filtered(path, columns, row_filter, cache_dir)
+        return
+    corpus = ensure_corpus(path, cache_dir)[list(columns)]
+    rows = None if row_filter is None else ensure_index(path, cache_dir).select(row_filter)
+    yield from corpus.iter_chunks(chunksize, rows)
+
+
+def pandas_nbytes(path, col, cache_dir=None):
+    """The memory of comment column ``col`` read into pandas, as read and as one ``str`` object per comment.
+
+    As read, the column holds objects with pandas 2, and Arrow strings with
+    the default string dtype of pandas 3.
+    """
+    as_read = as_objects = 0
+    for chunk in iter_cached(path, columns=[col], cache_dir=cache_dir):
+        as_read += int(chunk[col].memory_usage(deep=True, index=False))
+        as_objects += int(chunk[col].astype(object).memory_usage(deep=True, index=False))
+    return as_read, as_objects
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('dataset', help='path of the feedback CSV')
+    args = parser.parse_args(argv)
+
+    corpus = ensure_corpus(args.dataset)
+    print(f'{len(corpus):,} rows, corpus at {corpus_path(args.dataset)}')
+    print(f'{"column":<20} {"objects MiB":>12} {"as read MiB":>12} {"corpus MiB":>11} {"saved":>7}')
+    totals = np.zeros(3)
+    for col in corpus.columns:
+        sizes = np.array([*pandas_nbytes(args.dataset, col)[::-1], corpus[col].nbytes])
+        totals += sizes
+        print(f'{col:<20} {sizes[0] / 2 ** 20:>12.1f} {sizes[1] / 2 ** 20:>12.1f} {sizes[2] / 2 ** 20:>11.1f} '
+              f'{1 - sizes[2] / sizes[0]:>7.0%}')
+    print(f'{"total":<20} {totals[0] / 2 ** 20:>12.1f} {totals[1] / 2 ** 20:>12.1f} {totals[2] / 2 ** 20:>11.1f} '
+          f'{1 - totals[2] / totals[0]:>7.0%}')
+
+
+if __name__ == '__main__':
+    main()
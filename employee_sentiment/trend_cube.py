@@ -0,0 +1,287 @@
+"""Pre-aggregated rollup cube of the ratings over time.
+
+Section 4.4 plots weekly rating averages. Daily, monthly or per-location
+trends would each need another pass over every row. Instead, the cube
+keeps the sum and count of every rating per cell of
+
+    day x Location x Employee_Engagement_Activities x tenure bucket
+
+a few thousand cells per year, whatever the number of rows. The weeks,
+months and quarters are unions of days, so any trend (at any of those
+granularities, broken down by or filtered on any of the other dimensions)
+is a group-by over the cells, answered in milliseconds without touching
+the rows.
+
+Sums and counts add up, so a cube is extended with new rows by
+:meth:`TrendCube.update`, and cubes over separate batches or shards are
+combined with :meth:`TrendCube.merge`. Cubes are saved as Parquet, with the
+dimensions dictionary-encoded.
+
+Usage::
+
+    python -m employee_sentiment.trend_cube build cube.parquet Dataset.csv
+    python -m employee_sentiment.trend_cube append cube.parquet new_feedback.csv
+    python -m employee_sentiment.trend_cube query cube.parquet --granularity M --by Location
+"""
+
+import argparse # For the command line interface
+import os # For atomic replacement of the cube files
+
+import numpy as np # For the tenure buckets
+import pandas as pd # For data manipulation
+
+from .data_loader import DATE_COLUMN, RATING_COLUMNS, iter_dataset
+from .dataset_cache import (_has_pyarrow, _read_metadata, _temp_path, _write_json, cache_paths, covered_rows,
+                            ensure_cache, iter_cached)
+from .instrumentation import count_rows, stage
+
+TENURE_BUCKET = 'Tenure_Bucket'
+
+# Tenure buckets, in years: (upper bound, label)
+TENURE_BUCKETS = [(2, '0-2'), (5, '3-5'), (10, '6-10'), (np.inf, '11+')]
+
+# Bucket of the feedback without a tenure
+UNKNOWN_TENURE = 'unknown'
+
+# Dimensions of the cube cells, the day first
+DIMENSIONS = [DATE_COLUMN, 'Location', 'Employee_Engagement_Activities', TENURE_BUCKET]
+
+# Every column the cube reads
+CUBE_COLUMNS = RATING_COLUMNS + [DATE_COLUMN, 'Location', 'Employee_Engagement_Activities', 'Employee_Tenure']
+
+# Granularity: (pandas period, label frequency, adjective, noun). Each
+# period is labelled with its last day, as ``resample`` does
+GRANULARITIES = {
+    'D': ('D', 'D', 'Daily', 'Day'),
+    'W': ('W-SUN', 'W-SUN', 'Weekly', 'Week'),
+    'M': ('M', 'ME', 'Monthly', 'Month'),
+    'Q': ('Q-DEC', 'QE-DEC', 'Quarterly', 'Quarter'),
+}
+
+# Bump whenever the cells or their storage change, to invalidate old cubes
+CUBE_VERSION = 2
+
+
+def tenure_buckets(tenure):
+    """The tenure bucket label of each tenure, in years, or :data:`UNKNOWN_TENURE` for a missing one."""
+    bounds = [-np.inf] + [bound for bound, _ in TENURE_BUCKETS]
+    buckets = pd.cut(tenure, bounds, labels=[label for _, label in TENURE_BUCKETS])
+    return buckets.cat.add_categories(UNKNOWN_TENURE).fillna(UNKNOWN_TENURE).astype(str).rename(TENURE_BUCKET)
+
+
+def period_ends(days, granularity):
+    """Label each day with the last day of its period at ``granularity``."""
+    period, _, _, _ = GRANULARITIES[granularity]
+    return pd.DatetimeIndex(days).to_period(period).end_time.normalize()
+
+
+def _plain_index(index):
+    """Turn categorical levels of a cell index back into their values."""
+    return index.set_levels([level.astype(level.categories.dtype) if isinstance(level, pd.CategoricalIndex)
+                             else level for level in index.levels])
+
+
+def _accumulate(total, part):
+    if total is None:
+        return part
+    return total.add(part, fill_value=0)
+
+
+class TrendCube:
+    """Sums and counts of the ratings per cube cell, updated chunk by chunk."""
+
+    def __init__(self, columns=RATING_COLUMNS):
+        self.columns = list(columns)
+        self.sums = None
+        self.counts = None
+        self.rows = 0
+
+    def update(self, chunk):
+        """Add the rows of ``chunk``, which must have the dimension columns."""
+        keys = [
+            chunk[DATE_COLUMN].dt.normalize(),
+            chunk['Location'],
+            chunk['Employee_Engagement_Activities'],
+            tenure_buckets(chunk['Employee_Tenure']),
+        ]
+        grouped = chunk[self.columns].astype('float64').groupby(keys, observed=True)
+        sums, counts = grouped.sum(), grouped.count()
+        sums.index = counts.index = _plain_index(sums.index)
+        self.sums = _accumulate(self.sums, sums)
+        self.counts = _accumulate(self.counts, counts).astype('int64')
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other):
+        """Add the cells of another cube over the same ratings."""
+        if other.columns != self.columns:
+            raise ValueError('Cannot merge cubes over different rating columns')
+        if other.sums is not None:
+            self.sums = _accumulate(self.sums, other.sums)
+            self.counts = _accumulate(self.counts, other.counts).astype('int64')
+        self.rows += other.rows
+        return self
+
+    @property
+    def cells(self):
+        return 0 if self.sums is None else len(self.sums)
+
+    def _select(self, where, start, end):
+        """The sums and counts of the cells matching ``where`` and the date range."""
+        if self.sums is None:
+            raise ValueError('The cube is empty')
+        mask = np.ones(len(self.sums), dtype=bool)
+        index = self.sums.index
+        for dimension, values in (where or {}).items():
+            if dimension not in DIMENSIONS:
+                raise KeyError(f'Unknown dimension {dimension!r} (choose from {", ".join(DIMENSIONS)})')
+            values = [values] if isinstance(values, str) or not np.iterable(values) else list(values)
+            mask &= index.get_level_values(dimension).isin(values)
+        # The cells are days, so the bounds are too, as for the rows
+        days = index.get_level_values(DATE_COLUMN)
+        if start is not None:
+            mask &= days >= pd.Timestamp(start).normalize()
+        if end is not None:
+            mask &= days <= pd.Timestamp(end).normalize()
+        return self.sums[mask], self.counts[mask]
+
+    def rollup(self, granularity='W', by=(), where=None, start=None, end=None):
+        """Sums and counts of the ratings per period at ``granularity`` and value of each dimension in ``by``.
+
+        ``where`` maps dimensions to the value, or list of values, to keep;
+        ``start`` and ``end`` bound the days kept. Returns ``(sums, counts)``.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f'Unknown granularity {granularity!r} (choose from {", ".join(GRANULARITIES)})')
+        by = [by] if isinstance(by, str) else list(by)
+        with stage('cube_query'):
+            sums, counts = self._select(where, start, end)
+            # Label the distinct days once, then every cell through its day's code
+            days = sums.index.levels[0]
+            codes = sums.index.codes[0]
+            keys = [period_ends(days, granularity)[codes].rename(DATE_COLUMN)]
+            keys += [sums.index.get_level_values(dimension) for dimension in by]
+            return sums.groupby(keys).sum(), counts.groupby(keys).sum()
+
+    def trend(self, granularity='W', by=(), where=None, start=None, end=None):
+        """Mean ratings per period at ``granularity``, like ``resample(granularity).mean()`` on the rows.
+
+        Without ``by``, periods without feedback are kept, with missing
+        means. With it, the means are indexed by period and by the values of
+        each dimension in ``by``. See :meth:`rollup` for the filters.
+        """
+        sums, counts = self.rollup(granularity, by, where, start, end)
+        means = (sums / counts.where(counts > 0))[self.columns]
+        if by or means.empty:
+            return means
+        _, frequency, _, _ = GRANULARITIES[granularity]
+        periods = pd.date_range(means.index.min(), means.index.max(), freq=frequency, name=DATE_COLUMN)
+        return means.reindex(periods)
+
+    def to_frame(self):
+        """The cells as a flat frame: the dimensions, then the sum and count of each rating."""
+        frame = pd.concat([self.sums.add_suffix('_sum'), self.counts.add_suffix('_count')], axis=1)
+        frame = frame.reset_index()
+        for dimension in DIMENSIONS[1:]:
+            frame[dimension] = frame[dimension].astype('category')
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame, rows=0):
+        columns = [col[:-len('_sum')] for col in frame.columns if col.endswith('_sum')]
+        cube = cls(columns)
+        frame = frame.astype({dimension: str for dimension in DIMENSIONS[1:]}).set_index(DIMENSIONS)
+        if len(frame):
+            cube.sums = frame[[f'{col}_sum' for col in columns]].rename(columns=lambda col: col[:-len('_sum')])
+            cube.counts = frame[[f'{col}_count' for col in columns]].rename(
+                columns=lambda col: col[:-len('_count')]).astype('int64')
+        cube.rows = rows
+        return cube
+
+    def save(self, path, **metadata):
+        """Write the cube to the Parquet file ``path`` and its metadata next to it, atomically."""
+        tmp_path = _temp_path(path)
+        self.to_frame().to_parquet(tmp_path, index=False, compression='zstd')
+        os.replace(tmp_path, path)
+        _write_json(_meta_path(path), {'version': CUBE_VERSION, 'rows': self.rows, **metadata})
+
+    @classmethod
+    def load(cls, path):
+        meta = _read_metadata(_meta_path(path)) or {}
+        return cls.from_frame(pd.read_parquet(path), rows=meta.get('rows', 0))
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def cube_chunks(chunks, columns=RATING_COLUMNS):
+    """Build a :class:`TrendCube` in one pass over ``chunks``."""
+    cube = TrendCube(columns)
+    for chunk in chunks:
+        with stage('cube'):
+            cube.update(chunk)
+            count_rows(len(chunk))
+    return cube
+
+
+def ensure_cube(path, cache_dir=None):
+    """The cube of the dataset at ``path``, kept with its dataset cache.
+
+    When feedback has only been appended to the dataset, the new rows are
+    added to the cube; any other change rebuilds it. Without Parquet support
+    it is built from the CSV on every call.
+    """
+    if not _has_pyarrow():
+        return cube_chunks(iter_cached(path, columns=CUBE_COLUMNS, cache_dir=cache_dir))
+    meta = ensure_cache(path, cache_dir)
+    cube_path = os.path.splitext(cache_paths(path, cache_dir)[0])[0] + '.cube.parquet'
+    cube_meta = _read_metadata(_meta_path(cube_path))
+    covered = None
+    if cube_meta is not None and cube_meta.get('version') == CUBE_VERSION and os.path.exists(cube_path):
+        covered = covered_rows(path, cube_meta, cache_dir)
+    if covered == meta['rows']:
+        return TrendCube.load(cube_path)
+    cube = TrendCube.load(cube_path) if covered else TrendCube()
+    cube.merge(cube_chunks(iter_cached(path, columns=CUBE_COLUMNS, cache_dir=cache_dir, first_row=covered or 0)))
+    cube.save(cube_path, sha256=meta['sha256'], size=meta['size'])
+    return cube
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    for command, description in [('build', 'build a cube from feedback CSV files'),
+                                 ('append', 'add feedback CSV files to a cube')]:
+        subparser = commands.add_parser(command, help=description)
+        subparser.add_argument('cube', help='path of the cube Parquet file')
+        subparser.add_argument('csv', nargs='+', help='feedback CSV files')
+    query = commands.add_parser('query', help='print a trend')
+    query.add_argument('cube', help='path of the cube Parquet file')
+    query.add_argument('--granularity', choices=list(GRANULARITIES), default='W')
+    query.add_argument('--by', nargs='+', default=[], choices=DIMENSIONS[1:])
+    query.add_argument('--where', nargs='+', default=[], metavar='DIMENSION=VALUE',
+                       help='keep only the cells with these values (repeat a dimension for several values)')
+    query.add_argument('--start', help='first day kept')
+    query.add_argument('--end', help='last day kept')
+    args = parser.parse_args(argv)
+
+    if args.command == 'query':
+        where = {}
+        for condition in args.where:
+            dimension, _, value = condition.partition('=')
+            where.setdefault(dimension, []).append(value)
+        trend = TrendCube.load(args.cube).trend(args.granularity, args.by, where, args.start, args.end)
+        with pd.option_context('display.max_rows', None, 'display.width', None):
+            print(trend)
+        return
+
+    cube = TrendCube.load(args.cube) if args.command == 'append' else TrendCube()
+    for path in args.csv:
+        cube.merge(cube_chunks(iter_dataset(path, columns=CUBE_COLUMNS)))
+    cube.save(args.cube)
+    print(f'The cube now covers {cube.rows} rows in {cube.cells} cells')
+
+
+if __name__ == '__main__':
+    main()
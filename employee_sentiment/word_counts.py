@@ -0,0 +1,256 @@
+"""Streaming word frequency tables for the comment columns.
+
+Section 4.3 used to join every comment of a column into one lower-cased
+string and let ``WordCloud.generate_from_text`` tokenize it, which holds
+several copies of the whole corpus in memory. Here the comment columns are
+tokenized chunk by chunk and only a frequency table per column is kept; the
+word clouds are drawn from those tables with ``generate_from_frequencies``.
+
+Tokenization follows ``WordCloud.process_text``: lower-cased ``\\w[\\w']*``
+tokens with a trailing ``'s`` removed, numbers and stopwords dropped, and
+plurals merged into their singular form when both occur. Collocations
+(bigrams such as "life balance") are not counted. Repeated comments are
+tokenized once (see :mod:`text_cache`), and the distinct comments of a
+chunk in a single regex pass, as :mod:`sentiment_scores` scores them.
+
+By default the tables are exact, so memory grows with the vocabulary. For
+very large vocabularies, ``capacity`` bounds the table to the most frequent
+words, with counts estimated by a Count-Min sketch.
+
+Chunks are DataFrames, or :class:`~text_corpus.TextCorpus` chunks of the
+compact comment store, whose comments are deduplicated without a Python
+string per row.
+
+Tokenizing is CPU-bound; with ``workers > 1`` the chunks are tokenized in a
+process pool and the per-chunk counts merged in chunk order, so the result
+does not depend on the number of workers.
+"""
+
+from collections import deque # For the queue of chunks being tokenized
+from concurrent.futures import ProcessPoolExecutor # For tokenizing on several cores
+import itertools # For flattening the cached token lists
+import re # For tokenizing
+
+import numpy as np # For the Count-Min sketch
+import pandas as pd # For data manipulation
+
+from .data_loader import TEXT_COLUMNS
+from .instrumentation import count_rows, stage
+from .text_cache import deduplicate, namespace_for, process_distinct
+
+TOKEN_PATTERN = r"\w[\w']*"
+
+ROW_SEPARATOR = '\n'
+
+
+def default_stopwords():
+    """The stopwords WordCloud removes by default."""
+    from wordcloud import STOPWORDS
+    return frozenset(word.lower() for word in STOPWORDS)
+
+
+def tokenize_rows(texts):
+    """Tokenize a batch of comments in one regex pass over the whole batch.
+
+    Returns the tokens of all comments as one array, with the row number of
+    each token. The comments are joined with newlines, which the regex
+    returns as tokens of their own to mark where each row ends; newlines
+    inside a comment are turned into spaces first.
+    """
+    text = ROW_SEPARATOR.join(texts.fillna('').str.replace(ROW_SEPARATOR, ' ', regex=False)).lower()
+    tokens = np.array(re.findall(f'{ROW_SEPARATOR}|{TOKEN_PATTERN}', text), dtype=object)
+    separators = tokens == ROW_SEPARATOR
+    rows = np.cumsum(separators)[~separators]
+    return tokens[~separators], rows
+
+
+def _counted_words(comments, stopwords):
+    """The counted words of distinct, normalized comments, with the row of each.
+
+    Each distinct token is normalized and checked against the stopwords
+    once, not once per occurrence.
+    """
+    tokens, rows = tokenize_rows(comments)
+    codes, vocabulary = pd.factorize(tokens)
+    words = pd.Series(vocabulary, dtype=object).str.replace(r"'s$", '', regex=True)
+    counted = np.asarray(~words.str.isdigit() & ~words.isin(stopwords), dtype=bool)[codes]
+    return words.to_numpy(dtype=object)[codes[counted]], rows[counted]
+
+
+def _token_lists(comments, stopwords):
+    """The counted words of each distinct, normalized comment, as lists."""
+    words, rows = _counted_words(comments, stopwords)
+    ends = np.searchsorted(rows, np.arange(1, len(comments)))
+    return [part.tolist() for part in np.split(words, ends)]
+
+
+def _count(words, rows, counts):
+    """Sum the occurrences ``counts[row]`` of each word."""
+    occurrences = pd.Series(counts[rows], dtype='int64')
+    return occurrences.groupby(words).sum()
+
+
+def tokenize(texts, stopwords, cache=None):
+    """Count the words of a Series or text column of comments, returning a Series of counts.
+
+    Each distinct comment is tokenized once. Without ``cache``, the
+    distinct comments of the batch are tokenized together and counted
+    without a list per comment; with one, the words of each comment are
+    looked up in ``cache`` first.
+    """
+    if cache is None:
+        _, uniques, counts = deduplicate(texts)
+        words, rows = _counted_words(uniques, stopwords)
+        return _count(words, rows, counts)
+    namespace = namespace_for('tokens', TOKEN_PATTERN, sorted(stopwords))
+    _, token_lists, counts = process_distinct(
+        texts, lambda comments: _token_lists(comments, stopwords), cache, namespace)
+    lengths = np.fromiter(map(len, token_lists), dtype='int64', count=len(token_lists))
+    words = np.fromiter(itertools.chain.from_iterable(token_lists), dtype=object, count=lengths.sum())
+    return _count(words, np.repeat(np.arange(len(token_lists)), lengths), counts)
+
+
+def normalize_plurals(frequencies):
+    """Merge plural forms into their singular, as WordCloud does.
+
+    A word ending in "s" (but not "ss") is treated as a plural when the word
+    without the "s" also occurs.
+    """
+    merged = dict(frequencies)
+    for word in list(merged):
+        if word.endswith('s') and not word.endswith('ss') and word[:-1] in merged:
+            merged[word[:-1]] += merged.pop(word)
+    return merged
+
+
+class CountMinSketch:
+    """Count-Min sketch of token counts, updated with vectorized hashing."""
+
+    def __init__(self, width=1 << 20, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype='int64')
+        self._keys = [f'{row:016d}' for row in range(depth)]
+
+    def _buckets(self, tokens):
+        values = np.asarray(tokens, dtype=object)
+        return [pd.util.hash_array(values, hash_key=key, categorize=False) % self.width for key in self._keys]
+
+    def add(self, tokens, counts):
+        for row, buckets in enumerate(self._buckets(tokens)):
+            np.add.at(self.table[row], buckets, counts)
+
+    def estimate(self, tokens):
+        return np.min([self.table[row, buckets] for row, buckets in enumerate(self._buckets(tokens))], axis=0)
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError('Cannot merge sketches of different shapes')
+        self.table += other.table
+        return self
+
+
+class TokenCounter:
+    """Word frequencies of one comment column, updated chunk by chunk.
+
+    With ``capacity=None`` the counts are exact. Otherwise at most
+    ``capacity`` words are kept (the heavy hitters), and their counts are
+    Count-Min estimates, which may overcount but never undercount.
+    """
+
+    def __init__(self, capacity=None, stopwords=None, sketch_width=1 << 20, sketch_depth=4, cache=None):
+        self.capacity = capacity
+        self.cache = cache
+        self.stopwords = default_stopwords() if stopwords is None else frozenset(stopwords)
+        self.counts = pd.Series(dtype='int64')
+        self.sketch = CountMinSketch(sketch_width, sketch_depth) if capacity else None
+
+    def update(self, texts):
+        """Add the words of a Series of comments."""
+        self.add_counts(tokenize(texts, self.stopwords, self.cache))
+        return self
+
+    def add_counts(self, counts):
+        """Add a Series of word counts."""
+        if self.sketch is None:
+            self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+            return self
+        self.sketch.add(counts.index, counts.to_numpy())
+        self._keep_heavy_hitters(counts.index)
+        return self
+
+    def _keep_heavy_hitters(self, candidates):
+        words = self.counts.index.union(candidates)
+        estimates = pd.Series(self.sketch.estimate(words), index=words)
+        self.counts = estimates.nlargest(self.capacity, keep='first').astype('int64')
+
+    def merge(self, other):
+        """Add the counts of another counter over a different part of the corpus."""
+        if self.sketch is None:
+            self.counts = self.counts.add(other.counts, fill_value=0).astype('int64')
+            return self
+        self.sketch.merge(other.sketch)
+        self._keep_heavy_hitters(other.counts.index)
+        return self
+
+    def frequencies(self, max_words=None):
+        """The word frequencies, plurals merged, most frequent first."""
+        merged = pd.Series(normalize_plurals(self.counts.items()), dtype='int64')
+        merged = merged.sort_values(ascending=False, kind='stable')
+        if max_words is not None:
+            merged = merged.iloc[:max_words]
+        return merged.to_dict()
+
+
+def _comments(texts):
+    """The comments of a chunk column, missing ones as empty strings."""
+    return texts.fillna('') if isinstance(texts, pd.Series) else texts
+
+
+def _tokenize_chunk(chunk, stopwords):
+    """Count the words of every column of ``chunk``, in a worker process."""
+    return {col: tokenize(_comments(chunk[col]), stopwords) for col in chunk.columns}
+
+
+def map_chunks(function, chunks, workers, *args):
+    """Yield ``function(chunk, *args)`` and the rows of each of ``chunks``, in chunk order, from ``workers`` processes.
+
+    At most two chunks per worker are sent ahead of the results taken.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((pool.submit(function, chunk, *args), len(chunk)))
+            if len(pending) >= 2 * workers:
+                future, rows = pending.popleft()
+                yield future.result(), rows
+        while pending:
+            future, rows = pending.popleft()
+            yield future.result(), rows
+
+
+def count_words(chunks, columns=TEXT_COLUMNS, capacity=None, workers=1, cache=None):
+    """Count the words of each comment column over an iterable of chunks.
+
+    With ``workers > 1`` chunks are tokenized in that many processes, at
+    most two chunks per worker ahead of the merge; the workers deduplicate
+    comments but do not use ``cache``. Returns a :class:`TokenCounter` per
+    column.
+    """
+    counters = {col: TokenCounter(capacity=capacity, cache=cache) for col in columns}
+    stopwords = default_stopwords()
+    if workers <= 1:
+        for chunk in chunks:
+            with stage('word_counts'):
+                for col, counter in counters.items():
+                    counter.update(_comments(chunk[col]))
+                count_rows(len(chunk))
+        return counters
+
+    with stage('word_counts'):
+        for counts, rows in map_chunks(_tokenize_chunk, (chunk[list(columns)] for chunk in chunks), workers,
+                                       stopwords):
+            for col, column_counts in counts.items():
+                counters[col].add_counts(column_counts)
+            count_rows(rows)
+    return counters
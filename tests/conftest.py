@@ -0,0 +1,80 @@
+"""Small synthetic feedback datasets shared by the tests."""
+
+import shutil # For the datasets a test changes
+
+import numpy as np # For drawing the values
+import pandas as pd # For writing the CSV
+import pytest
+
+from employee_sentiment.data_loader import COLUMNS, RATING_COLUMNS, TEXT_COLUMNS
+from employee_sentiment.dataset_cache import load_cached
+
+ROWS = 3_000
+
+FIRST_DATE = pd.Timestamp('2023-01-01')
+
+# Words of the comments, with capitals, plurals, possessives, numbers and
+# stopwords, which the word tables must handle like WordCloud
+WORDS = (
+    "Great great people team teams manager managers company's pay hours hour work-life balance "
+    "the and to of is not very don't 2023 10 culture benefits benefit politics meetings meeting "
+    "Management growth class classes it's office food"
+).split()
+
+# Share of the ratings, tenures and advice left blank
+MISSING = 0.03
+
+
+def _blank(rng, values, share=MISSING):
+    """``values`` as a nullable integer column with a ``share`` of them missing."""
+    values = pd.array(values, dtype='Int8')
+    values[rng.random(len(values)) < share] = pd.NA
+    return values
+
+
+def make_rows(rows, seed=0, first_id=1):
+    """``rows`` rows of synthetic feedback, in the column order of the export."""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({'ID': np.arange(first_id, first_id + rows)})
+    for col in TEXT_COLUMNS:
+        frame[col] = [' '.join(rng.choice(WORDS, size=rng.integers(1, 9))) for _ in range(rows)]
+    frame.loc[rng.random(rows) < 0.3, 'Advice_To_Mgmt'] = None
+    # Ratings around a common score, so that they correlate
+    overall = rng.integers(1, 6, size=rows)
+    for col in RATING_COLUMNS:
+        frame[col] = _blank(rng, np.clip(overall + rng.integers(-1, 2, size=rows), 1, 5))
+    # Mostly short tenures, so that the boxplots have outliers
+    frame['Employee_Tenure'] = _blank(rng, np.minimum(rng.geometric(0.2, size=rows), 40))
+    frame['Employee_Engagement_Activities'] = np.where(rng.random(rows) < 0.5, 'Yes', 'No')
+    frame['Location'] = np.array(['CityA', 'CityB', 'CityC'])[rng.integers(0, 3, size=rows)]
+    seconds = rng.integers(0, 365 * 24 * 3600, size=rows)
+    frame['Feedback_Date'] = (FIRST_DATE + pd.to_timedelta(seconds, unit='s')).astype(str)
+    return frame[COLUMNS]
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    """Path of a synthetic feedback CSV, with its caches next to it."""
+    path = tmp_path_factory.mktemp('dataset') / 'feedback.csv'
+    make_rows(ROWS).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def rows(dataset):
+    """Every row of the dataset, as the cache delivers them."""
+    return load_cached(dataset)
+
+
+@pytest.fixture
+def own_dataset(dataset, tmp_path):
+    """A copy of the dataset that the test may append to, without its caches."""
+    path = tmp_path / 'feedback.csv'
+    shutil.copy(dataset, path)
+    return str(path)
+
+
+def append_rows(path, rows, seed):
+    """Append ``rows`` new synthetic rows to the CSV at ``path``."""
+    last_id = int(pd.read_csv(path, usecols=['ID'])['ID'].iloc[-1])
+    make_rows(rows, seed=seed, first_id=last_id + 1).to_csv(path, mode='a', header=False, index=False)
@@ -0,0 +1,38 @@
+"""The rating reports of :class:`RatingAggregator` against the pandas calls they replace."""
+
+import pandas as pd # For the expected reports
+import pytest
+
+from employee_sentiment.aggregations import AGGREGATE_COLUMNS, GROUP_COLUMNS, aggregate_chunks
+from employee_sentiment.data_loader import RATING_COLUMNS
+from employee_sentiment.dataset_cache import iter_cached
+
+
+@pytest.fixture(scope='module')
+def aggregates(dataset):
+    return aggregate_chunks(iter_cached(dataset, columns=AGGREGATE_COLUMNS, chunksize=700))
+
+
+def test_correlation(aggregates, rows):
+    expected = rows[RATING_COLUMNS].astype('float64').corr()
+    pd.testing.assert_frame_equal(aggregates.correlation(), expected, check_exact=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize('key', GROUP_COLUMNS)
+def test_group_means(aggregates, rows, key):
+    expected = rows.groupby(key, observed=True)[RATING_COLUMNS].mean().astype('float64')
+    pd.testing.assert_frame_equal(aggregates.group_means(key), expected, check_exact=False, rtol=1e-12,
+                                  check_index_type=False, check_categorical=False)
+
+
+def test_crosstab(aggregates, rows):
+    expected = pd.crosstab(rows['Employee_Engagement_Activities'], rows['Location'])
+    pd.testing.assert_frame_equal(aggregates.crosstab(), expected, check_index_type=False,
+                                  check_column_type=False, check_categorical=False)
+
+
+def test_merge_matches_one_pass(aggregates, rows):
+    halves = [aggregate_chunks([part]) for part in (rows.iloc[:1000], rows.iloc[1000:])]
+    merged = halves[0].merge(halves[1])
+    for name, report in aggregates.reports().items():
+        pd.testing.assert_frame_equal(merged.reports()[name], report, check_exact=False, rtol=1e-12)
@@ -0,0 +1,47 @@
+"""Rows found through the index and bitmaps against a scan of every row."""
+
+import argparse # For the parsed options
+
+import pytest
+
+from employee_sentiment.dataset_index import RowFilter, count_filtered, filter_from_args, iter_filtered, load_filtered
+
+FILTERS = [
+    RowFilter(location='CityA'),
+    RowFilter(location=['CityA', 'CityC'], engagement='Yes'),
+    RowFilter(min_tenure=3, max_tenure=8),
+    RowFilter(min_tenure=12),
+    RowFilter(max_tenure=2, start='2023-03-05 12:00', end='2023-06-10 08:00'),
+    RowFilter(engagement='No', start='2023-11-01'),
+]
+
+
+@pytest.mark.parametrize('row_filter', FILTERS, ids=repr)
+def test_index_matches_scan(dataset, rows, row_filter):
+    expected = rows['ID'][row_filter.mask(rows)].tolist()
+    assert count_filtered(dataset, row_filter) == len(expected)
+    assert load_filtered(dataset, ['ID'], row_filter)['ID'].tolist() == expected
+    assert [id_ for chunk in iter_filtered(dataset, ['ID'], row_filter) for id_ in chunk['ID']] == expected
+
+
+def test_scan_excludes_missing_tenure(rows):
+    kept = rows[RowFilter(min_tenure=0).mask(rows)]
+    assert len(kept) == rows['Employee_Tenure'].notna().sum()
+
+
+def _options(**options):
+    defaults = dict(location=None, engagement=None, min_tenure=None, max_tenure=None, start=None, end=None,
+                    period=None)
+    return argparse.Namespace(**{**defaults, **options})
+
+
+@pytest.mark.parametrize('options', [{'start': 'not a day'}, {'period': '2023Q9'},
+                                     {'period': '2023Q3', 'end': '2023-08-01'}])
+def test_invalid_filters(options):
+    with pytest.raises(ValueError):
+        filter_from_args(_options(**options))
+
+
+def test_period_filter():
+    row_filter = filter_from_args(_options(period='2023-07'))
+    assert (str(row_filter.start.date()), str(row_filter.end.date())) == ('2023-07-01', '2023-07-31')
@@ -0,0 +1,32 @@
+"""Box statistics from value counts against ``matplotlib.cbook.boxplot_stats`` on the rows."""
+
+from matplotlib import cbook
+import pytest
+
+from employee_sentiment.data_loader import CATEGORICAL_COLUMNS
+from employee_sentiment.distributions import BOX_COLUMN, box_stats, count_chunks, count_values
+
+STATISTICS = ['mean', 'iqr', 'cilo', 'cihi', 'whishi', 'whislo', 'q1', 'med', 'q3']
+
+
+def _assert_box_stats_equal(stats, values):
+    expected, = cbook.boxplot_stats(values)
+    for name in STATISTICS:
+        assert stats[name] == pytest.approx(expected[name], rel=1e-12), name
+    # The counts list each outlier value once
+    assert list(stats['fliers']) == sorted(set(expected['fliers']))
+
+
+def test_box_stats(rows):
+    values = rows[BOX_COLUMN].dropna()
+    _assert_box_stats_equal(box_stats(count_values(values)), values.to_numpy(dtype='float64'))
+
+
+@pytest.mark.parametrize('key', CATEGORICAL_COLUMNS)
+def test_group_box_stats(rows, key):
+    counter = count_chunks([rows.iloc[:1000], rows.iloc[1000:]], columns=[])
+    groups = counter.group_value_counts(key)
+    assert sorted(groups) == sorted(rows[key].unique())
+    for group, counts in groups.items():
+        values = rows.loc[rows[key] == group, BOX_COLUMN].dropna().to_numpy(dtype='float64')
+        _assert_box_stats_equal(box_stats(counts), values)
@@ -0,0 +1,33 @@
+"""The incrementally updated statistics store against a full recompute."""
+
+import pandas as pd # For the expected reports
+
+from employee_sentiment.aggregations import AGGREGATE_COLUMNS, aggregate_chunks
+from employee_sentiment.data_loader import iter_dataset
+from employee_sentiment.dataset_cache import iter_cached
+from employee_sentiment.stats_store import StatisticsStore, ensure_aggregates, verify
+
+from conftest import append_rows, make_rows
+
+
+def test_appended_batches(tmp_path):
+    batches = []
+    for seed in range(3):
+        batches.append(tmp_path / f'batch-{seed}.csv')
+        make_rows(1_000, seed=seed, first_id=seed * 1_000 + 1).to_csv(batches[-1], index=False)
+    store = StatisticsStore(str(tmp_path / 'stats.pkl'))
+    for path in batches:
+        store.append(iter_dataset(path, columns=AGGREGATE_COLUMNS))
+    store = StatisticsStore(str(tmp_path / 'stats.pkl'))
+    assert store.rows == 3_000
+    assert verify(store, (chunk for path in batches for chunk in iter_dataset(path, columns=AGGREGATE_COLUMNS))) == []
+
+
+def test_append_extends_store(own_dataset):
+    ensure_aggregates(own_dataset)
+    append_rows(own_dataset, 500, seed=1)
+    aggregates = ensure_aggregates(own_dataset)
+    expected = aggregate_chunks(iter_cached(own_dataset, columns=AGGREGATE_COLUMNS))
+    assert aggregates.rows == expected.rows
+    for name, report in expected.reports().items():
+        pd.testing.assert_frame_equal(aggregates.reports()[name], report, check_exact=False, rtol=1e-12)
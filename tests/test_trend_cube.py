@@ -0,0 +1,45 @@
+"""Trends read from the rollup cube against ``resample().mean()`` on the rows."""
+
+import pandas as pd # For the expected trends
+import pytest
+
+from employee_sentiment.data_loader import DATE_COLUMN, RATING_COLUMNS
+from employee_sentiment.dataset_cache import iter_cached
+from employee_sentiment.dataset_index import RowFilter
+from employee_sentiment.trend_cube import CUBE_COLUMNS, cube_chunks, ensure_cube
+
+from conftest import append_rows
+
+# Granularity of the cube, and the matching resample rule
+RULES = {'D': 'D', 'W': 'W', 'M': 'ME', 'Q': 'QE'}
+
+
+def _resampled(rows, rule):
+    return rows.set_index(DATE_COLUMN)[RATING_COLUMNS].astype('float64').resample(rule).mean()
+
+
+def _assert_trend_equal(trend, expected):
+    pd.testing.assert_frame_equal(trend, expected, check_exact=False, rtol=1e-12, check_freq=False,
+                                  check_index_type=False)
+
+
+@pytest.mark.parametrize('granularity', list(RULES))
+def test_trend(dataset, rows, granularity):
+    _assert_trend_equal(ensure_cube(dataset).trend(granularity), _resampled(rows, RULES[granularity]))
+
+
+def test_filtered_trend(dataset, rows):
+    row_filter = RowFilter(location=['CityB', 'CityC'], engagement='Yes', start='2023-03-05 12:00',
+                           end='2023-09-30 08:00')
+    trend = ensure_cube(dataset).trend('W', (), *row_filter.cube_where())
+    _assert_trend_equal(trend, _resampled(rows[row_filter.mask(rows)], 'W'))
+
+
+def test_append_extends_cube(own_dataset):
+    ensure_cube(own_dataset)
+    append_rows(own_dataset, 500, seed=1)
+    cube = ensure_cube(own_dataset)
+    rebuilt = cube_chunks(iter_cached(own_dataset, columns=CUBE_COLUMNS))
+    assert cube.rows == rebuilt.rows
+    _assert_trend_equal(cube.trend('D'), rebuilt.trend('D'))
+    _assert_trend_equal(cube.trend('M', ['Location']), rebuilt.trend('M', ['Location']))
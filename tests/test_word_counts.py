@@ -0,0 +1,28 @@
+"""The word tables of section 4.3 against ``WordCloud.process_text``."""
+
+import pytest
+from wordcloud import WordCloud
+
+from employee_sentiment import sections
+from employee_sentiment.data_loader import TEXT_COLUMNS
+from employee_sentiment.dataset_cache import iter_cached
+from employee_sentiment.word_counts import count_words
+
+
+def _expected(rows, col):
+    """The frequencies WordCloud counts in the joined, lower-cased comments."""
+    text = ' '.join(rows[col][rows[col] != '']).lower()
+    return WordCloud(collocations=False).process_text(text)
+
+
+def test_count_words(dataset, rows):
+    counters = count_words(iter_cached(dataset, columns=TEXT_COLUMNS, chunksize=700))
+    for col in TEXT_COLUMNS:
+        assert counters[col].frequencies() == _expected(rows, col)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_word_frequency_section(dataset, rows, workers):
+    tables, = sections.word_frequency(dataset, workers=workers)['figures']['word_clouds']
+    for col in TEXT_COLUMNS:
+        assert tables[col] == _expected(rows, col)